@@ -0,0 +1,112 @@
+# Agregados de uma captura, calculados uma única vez na ingestão
+import copy
+import math
+
+import config
+import distribution
+import lazy
+import stats
+import throughput
+
+np = lazy.module('numpy')
+
+
+class Aggregates:
+    def __init__(self, packet_count, protocol_counts, source_counts, length_stats,
+                 inter_arrival_time_stats, length_histogram, inter_arrival_time_histogram, time_bounds):
+        self.packet_count = packet_count
+        self.protocol_counts = protocol_counts
+        self.source_counts = source_counts
+        self.length_stats = length_stats
+        self.inter_arrival_time_stats = inter_arrival_time_stats
+        self.length_histogram = length_histogram
+        self.inter_arrival_time_histogram = inter_arrival_time_histogram
+        # Segundos inteiros [início, fim) que cobrem os pacotes, para o
+        # seletor de janela (None sem pacotes)
+        self.time_bounds = time_bounds
+
+
+# Contagem por valor, sem as categorias que não aparecem na coluna
+def value_counts(column):
+    counts = column.value_counts()
+    counts = counts[counts > 0]
+    counts.index = counts.index.astype(str)
+    return counts
+
+
+# Contagens em ordem descendente. Error é o quanto cada contagem pode estar
+# superestimada no modo aproximado (zero nas contagens exatas)
+def top_counts(counter, column):
+    counts = counter.top()
+    frame = counts.rename_axis(column).reset_index(name="Count")
+    frame["Error"] = counter.errors.reindex(counts.index).to_numpy()
+    return frame
+
+
+def compute_aggregates(df):
+    running = RunningAggregates()
+    running.update(df)
+    return running.aggregates()
+
+
+class RunningAggregates:
+    # Agregados atualizados a cada bloco de pacotes, sem reler os anteriores:
+    # usados na ingestão, bloco a bloco, e nas capturas ao vivo. No modo
+    # aproximado, as contagens por protocolo e por dispositivo guardam apenas
+    # os valores mais frequentes
+    def __init__(self, approximate=None):
+        if approximate is None:
+            approximate = config.APPROXIMATE_COUNTS
+        capacity = config.HEAVY_HITTERS if approximate else None
+        self.packet_count = 0
+        self.protocol_totals = stats.SpaceSaving(capacity)
+        self.source_totals = stats.SpaceSaving(capacity)
+        self.length_summary = stats.ColumnSummary()
+        self.inter_arrival_time_summary = stats.ColumnSummary()
+        self.length_histogram = distribution.histogram([])
+        self.inter_arrival_time_histogram = distribution.histogram([])
+        self.time_summary = stats.RunningStats()
+        # Totais da aba de vazão, guardados à parte dos agregados
+        self.throughput = throughput.ThroughputBuilder()
+        self.last_time = None
+
+    def update(self, chunk):
+        if len(chunk) == 0:
+            return
+        self.packet_count += len(chunk)
+        self.protocol_totals.update(value_counts(chunk["Protocol"]))
+        self.source_totals.update(value_counts(chunk["Source"]))
+        self.throughput.update(chunk)
+
+        lengths = chunk["Length"].to_numpy(dtype=np.float64)
+        self.length_summary.update(lengths)
+        self.length_histogram.update(lengths)
+
+        # O intervalo do primeiro pacote do bloco é medido a partir do último
+        # pacote do bloco anterior
+        times = chunk["Time"].to_numpy(dtype=np.float64)
+        self.time_summary.update(times)
+        if self.last_time is not None:
+            times = np.concatenate(([self.last_time], times))
+        inter_arrival_times = np.diff(times)
+        self.inter_arrival_time_summary.update(inter_arrival_times)
+        self.inter_arrival_time_histogram.update(inter_arrival_times)
+        self.last_time = times[-1]
+
+    def aggregates(self):
+        protocol_counts = top_counts(self.protocol_totals, "Protocol")
+        protocol_counts["Percentage"] = (protocol_counts["Count"] / max(self.packet_count, 1)) * 100
+        time_bounds = None
+        if self.time_summary.count:
+            time_bounds = (int(math.floor(self.time_summary.min)), int(math.floor(self.time_summary.max)) + 1)
+        return Aggregates(
+            packet_count=self.packet_count,
+            protocol_counts=protocol_counts,
+            source_counts=top_counts(self.source_totals, "Source"),
+            length_stats=self.length_summary.describe(),
+            inter_arrival_time_stats=self.inter_arrival_time_summary.describe(),
+            # Histogramas usados nas curvas de distribuição da aba de estatísticas
+            length_histogram=copy.deepcopy(self.length_histogram),
+            inter_arrival_time_histogram=copy.deepcopy(self.inter_arrival_time_histogram),
+            time_bounds=time_bounds,
+        )
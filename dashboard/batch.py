@@ -0,0 +1,150 @@
+# Análise em lote, sem navegador: processa um diretório de capturas (CSV do
+# Wireshark, pcap ou pcapng) em paralelo e grava um resumo de cada uma.
+#
+#   python batch.py capturas/ relatorios/ --jobs 8
+#
+# Para cada captura, grava <nome>.json com os totais e as estatísticas, e
+# <nome>.protocols.parquet, <nome>.sources.parquet e <nome>.flows.parquet.
+# Com --recursive, os resumos repetem os subdiretórios das capturas
+import argparse
+import hashlib
+import json
+import math
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+import analysis
+import flows
+import ingest
+
+# Extensões processadas ao varrer o diretório
+CAPTURE_EXTENSIONS = ('.csv', '.pcap', '.pcapng')
+
+# Bytes lidos por vez no cálculo do digest
+DIGEST_CHUNK_BYTES = 4 * 2 ** 20
+
+
+def file_digest(path):
+    # Mesmo digest da ingestão pelo dashboard, para cruzar os resumos com o
+    # armazenamento
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(DIGEST_CHUNK_BYTES), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+# NaN e infinitos não existem em JSON: viram null
+def _number(value):
+    value = float(value)
+    return value if math.isfinite(value) else None
+
+
+def _stats(series):
+    return {key: _number(value) for key, value in series.items()}
+
+
+def _counts(frame, column):
+    return [{column.lower(): str(value), 'count': int(count), 'error': int(error)}
+            for value, count, error in zip(frame[column], frame["Count"], frame["Error"])]
+
+
+def summarize(df, aggregates, name, digest):
+    times = df["Time"]
+    return {
+        'name': name,
+        'digest': digest,
+        'packets': int(aggregates.packet_count),
+        'start': _number(times.min()) if len(df) else None,
+        'duration': _number(times.max() - times.min()) if len(df) else None,
+        'bytes': int(df["Length"].to_numpy().sum(dtype=np.int64)),
+        'length': _stats(aggregates.length_stats),
+        'inter_arrival_time': _stats(aggregates.inter_arrival_time_stats),
+        'protocols': _counts(aggregates.protocol_counts, 'Protocol'),
+        'sources': _counts(aggregates.source_counts, 'Source'),
+    }
+
+
+def analyze_capture(path, output_dir, top_flows=None, name=None):
+    # Executado em um processo do pool: lê a captura, calcula os agregados
+    # bloco a bloco, como na ingestão do dashboard, e grava os resumos.
+    # name: caminho da captura relativo ao diretório varrido, que define o
+    # dos resumos; capturas com o mesmo nome em subdiretórios diferentes não
+    # se sobrescrevem
+    started = time.perf_counter()
+    name = name or os.path.basename(path)
+    stem = os.path.join(output_dir, name)
+    os.makedirs(os.path.dirname(stem), exist_ok=True)
+
+    running = analysis.RunningAggregates()
+    df = ingest.read_capture(path, aggregates=running)
+    aggregates = running.aggregates()
+
+    summary = summarize(df, aggregates, name, file_digest(path))
+    aggregates.protocol_counts.to_parquet(f'{stem}.protocols.parquet', index=False)
+    aggregates.source_counts.to_parquet(f'{stem}.sources.parquet', index=False)
+    if len(df):
+        conversations = flows.compute_flows(df)
+        if top_flows is not None:
+            conversations = conversations.head(top_flows)
+        conversations.to_parquet(f'{stem}.flows.parquet', index=False)
+        summary['flows'] = len(conversations)
+
+    summary['elapsed'] = time.perf_counter() - started
+    with open(f'{stem}.json', 'w', encoding='utf-8') as f:
+        json.dump(summary, f, ensure_ascii=False, indent=2)
+    return summary
+
+
+def find_captures(directory, recursive=False):
+    paths = []
+    for root, dirs, files in os.walk(directory):
+        paths.extend(os.path.join(root, file) for file in files
+                     if file.lower().endswith(CAPTURE_EXTENSIONS))
+        if not recursive:
+            break
+    return sorted(paths)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Resume capturas de rede em lote.')
+    parser.add_argument('captures', help='diretório com as capturas (CSV, pcap ou pcapng)')
+    parser.add_argument('output', help='diretório dos resumos')
+    parser.add_argument('--jobs', type=int, default=os.cpu_count(),
+                        help='processos em paralelo (padrão: número de CPUs)')
+    parser.add_argument('--recursive', action='store_true', help='inclui os subdiretórios')
+    parser.add_argument('--top-flows', type=int, default=None,
+                        help='grava apenas as N conversas com mais bytes')
+    args = parser.parse_args(argv)
+
+    paths = find_captures(args.captures, args.recursive)
+    if not paths:
+        print(f'Nenhuma captura em {args.captures}', file=sys.stderr)
+        return 1
+    os.makedirs(args.output, exist_ok=True)
+
+    failures = 0
+    # Cada captura é lida em um processo separado; o pool limita quantas
+    # ficam em memória ao mesmo tempo
+    with ProcessPoolExecutor(max_workers=max(args.jobs, 1)) as pool:
+        futures = {pool.submit(analyze_capture, path, args.output, args.top_flows,
+                               os.path.relpath(path, args.captures)): path
+                   for path in paths}
+        for future in as_completed(futures):
+            path = futures[future]
+            try:
+                summary = future.result()
+            except Exception as error:
+                failures += 1
+                print(f'{path}: erro: {error}', file=sys.stderr)
+            else:
+                print(f'{path}: {summary["packets"]} pacotes em {summary["elapsed"]:.1f} s')
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,338 @@
+# Benchmarks da ingestão e das abas com capturas sintéticas no formato do
+# CSV exportado pelo Wireshark.
+#
+#   python benchmark.py run --rows 10k,1M --label minha-versao
+#   python benchmark.py compare benchmarks/antes.json benchmarks/depois.json
+#   python benchmark.py imports
+#
+# Cada etapa registra o tempo, o pico de memória residente e, nas abas, o
+# tamanho do JSON enviado ao navegador. Os resultados ficam em
+# benchmarks/<label>.json, para comparar versões
+import argparse
+import csv
+import json
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+# Tamanhos de referência das capturas sintéticas
+SIZES = ['10k', '1M', '10M', '50M']
+
+# Linhas geradas e gravadas por vez
+GENERATE_CHUNK_ROWS = 1_000_000
+
+BENCHMARK_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmarks')
+
+# Intervalo, em segundos, entre as leituras da memória residente
+MEMORY_SAMPLE_SECONDS = 0.01
+
+# Pacotes da captura usada para aquecer os caches do plotly antes das medidas
+WARMUP_ROWS = 1000
+
+# Diferença de tempo, em relação à versão anterior, tratada como regressão
+REGRESSION_THRESHOLD = 0.2
+
+# Tempo máximo, em segundos, para importar o dashboard (o servidor só aceita
+# conexões depois disso). Os módulos pesados só podem ser carregados pelos
+# callbacks
+IMPORT_BUDGET_SECONDS = 1.0
+HEAVY_MODULES = ('numpy', 'pandas', 'pyarrow', 'plotly.express', 'scipy')
+
+# Protocolos e pesos aproximados de uma captura de rede local
+PROTOCOLS = ['TCP', 'UDP', 'TLSv1.2', 'TLSv1.3', 'DNS', 'HTTP', 'QUIC', 'ARP', 'ICMP', 'MDNS', 'SSDP',
+             'NTP', 'DHCP', 'Modbus/TCP', 'IGMPv2']
+PROTOCOL_WEIGHTS = [30, 14, 12, 10, 8, 5, 6, 3, 2, 2, 2, 1, 1, 3, 1]
+
+# Dispositivos da rede; poucos concentram a maior parte do tráfego (Zipf)
+HOSTS = 5000
+
+
+def parse_rows(text):
+    text = text.strip().lower()
+    factor = {'k': 10 ** 3, 'm': 10 ** 6}.get(text[-1], 1)
+    return int(float(text.rstrip('km')) * factor)
+
+
+def _hosts(rng):
+    octets = rng.integers(1, 255, (HOSTS, 2))
+    hosts = [f'192.168.{a}.{b}' for a, b in octets]
+    # Alguns endereços externos e IPv6, como nas capturas reais
+    hosts[-50:] = [f'2001:db8::{i:x}' for i in range(50)]
+    hosts[-100:-50] = [f'{a}.{b}.{c}.{d}' for a, b, c, d in rng.integers(1, 255, (50, 4))]
+    return np.array(hosts, dtype=object)
+
+
+def _chunk(rng, hosts, first, rows, start_time):
+    weights = 1 / np.arange(1, HOSTS + 1) ** 1.1
+    weights /= weights.sum()
+    probabilities = np.array(PROTOCOL_WEIGHTS) / sum(PROTOCOL_WEIGHTS)
+    protocols = np.array(PROTOCOLS, dtype=object)[rng.choice(len(PROTOCOLS), rows, p=probabilities)]
+
+    # Comprimentos concentrados em pacotes pequenos (ACKs) e no MTU
+    lengths = np.where(rng.random(rows) < 0.4, 60 + rng.integers(0, 20, rows),
+                       np.where(rng.random(rows) < 0.5, 1514, rng.integers(60, 1514, rows)))
+    times = start_time + np.cumsum(rng.exponential(1e-4, rows))
+    ports = pd.Series(rng.integers(1024, 65535, rows)).astype(str)
+    info = ('443 → ' + ports + ' [ACK] Seq=' + pd.Series(rng.integers(1, 10 ** 6, rows)).astype(str)
+            + ' Len=' + pd.Series(lengths).astype(str))
+
+    frame = pd.DataFrame({
+        'No.': np.arange(first, first + rows),
+        'Time': np.round(times, 6),
+        'Source': hosts[rng.choice(HOSTS, rows, p=weights)],
+        'Destination': hosts[rng.choice(HOSTS, rows, p=weights)],
+        'Protocol': protocols,
+        'Length': lengths,
+        'Info': info,
+    })
+    return frame, times[-1]
+
+
+# Gera (uma única vez, com semente fixa) a captura sintética com rows pacotes
+def generate_capture(rows, directory, seed=0):
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f'synthetic-{rows}.csv')
+    if os.path.exists(path):
+        return path
+
+    rng = np.random.default_rng(seed)
+    hosts = _hosts(rng)
+    staging = f'{path}.tmp'
+    last_time = 0.0
+    with open(staging, 'w', newline='') as f:
+        for first in range(0, rows, GENERATE_CHUNK_ROWS):
+            frame, last_time = _chunk(rng, hosts, first + 1, min(GENERATE_CHUNK_ROWS, rows - first), last_time)
+            # Todos os campos entre aspas, como na exportação do Wireshark
+            frame.to_csv(f, index=False, header=first == 0, quoting=csv.QUOTE_ALL)
+    os.replace(staging, path)
+    return path
+
+
+# Memória residente do processo, em MB (apenas no Linux)
+def resident_mb():
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * resource.getpagesize() / 2 ** 20
+    except OSError:
+        return None
+
+
+class Stage:
+    # Mede uma etapa: tempo e pico de memória residente durante ela, lida
+    # por uma thread a cada MEMORY_SAMPLE_SECONDS. Ao contrário do
+    # tracemalloc, a amostragem não deixa a etapa mais lenta
+    def __init__(self, results, name, memory=True):
+        self.results = results
+        self.name = name
+        self.memory = memory and resident_mb() is not None
+        self.result = {}
+        self._done = threading.Event()
+
+    def _sample(self):
+        while not self._done.wait(MEMORY_SAMPLE_SECONDS):
+            self.peak = max(self.peak, resident_mb())
+
+    def __enter__(self):
+        if self.memory:
+            self.start_rss = self.peak = resident_mb()
+            self._sampler = threading.Thread(target=self._sample, daemon=True)
+            self._sampler.start()
+        self.started = time.perf_counter()
+        return self.result
+
+    def __exit__(self, *exc):
+        self.result['seconds'] = time.perf_counter() - self.started
+        if self.memory:
+            self._done.set()
+            self._sampler.join()
+            self.peak = max(self.peak, resident_mb())
+            self.result['peak_rss_mb'] = self.peak
+            self.result['rss_growth_mb'] = self.peak - self.start_rss
+        self.results[self.name] = self.result
+
+
+def _payload_bytes(output):
+    import plotly.io.json
+    return len(plotly.io.json.to_json_plotly(output))
+
+
+def benchmark_capture(path, memory=True):
+    # As abas são chamadas como o Dash as chama, com a captura já ingerida
+    import analysis
+    import dashboard_8
+    import ingest
+    from table import PAGE_SIZE
+
+    results = {}
+    with Stage(results, 'parse', memory):
+        df = ingest.read_capture(path)
+    with Stage(results, 'aggregate', memory):
+        aggregates = analysis.compute_aggregates(df)
+
+    digest = os.path.basename(path)
+    store = dashboard_8.registry.store
+    with Stage(results, 'store', memory):
+        store.save(digest, digest, df, aggregates)
+        del df
+        dataset = dashboard_8.registry.get(digest)
+    results['store']['frame_mb'] = dataset.memory_usage / 2 ** 20
+
+    with Stage(results, 'tab1', memory) as result:
+        output = dashboard_8.update_overview_tab('tab1', digest, None, None)
+        result['payload_bytes'] = _payload_bytes(output)
+    with Stage(results, 'tab2', memory) as result:
+        output = dashboard_8.update_details_tab('tab2', digest, None)
+        output += dashboard_8.update_packet_page(0, PAGE_SIZE, [], '', None, digest)
+        result['payload_bytes'] = _payload_bytes(output)
+    with Stage(results, 'tab3', memory) as result:
+        output = dashboard_8.update_statistics_tab('tab3', digest, None, None)
+        result['payload_bytes'] = _payload_bytes(output)
+    return results
+
+
+def _version():
+    try:
+        return subprocess.run(['git', 'describe', '--always', '--dirty'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(args):
+    # O armazenamento e os caches do dashboard ficam em um diretório
+    # temporário, apagado no fim, para não misturar as capturas sintéticas
+    # com as reais
+    store_dir = os.environ['ANALISE_DATA_DIR'] = tempfile.mkdtemp(prefix='analise-benchmark-')
+    version = _version()
+    label = args.label or version or time.strftime('%Y%m%d-%H%M%S')
+    report = {
+        'label': label,
+        'version': version,
+        'created': time.time(),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'machine': platform.machine(),
+        'cpus': os.cpu_count(),
+        'captures': {},
+    }
+
+    # A primeira figura do plotly carrega modelos e validadores; sem o
+    # aquecimento, esse custo apareceria na aba de visão geral da primeira captura
+    try:
+        benchmark_capture(generate_capture(WARMUP_ROWS, args.data_dir), memory=False)
+
+        for size in args.rows.split(','):
+            rows = parse_rows(size)
+            path = generate_capture(rows, args.data_dir)
+            print(f'{rows:,} pacotes', flush=True)
+            results = benchmark_capture(path, memory=not args.no_memory)
+            report['captures'][str(rows)] = results
+            for stage, result in results.items():
+                extra = f", {result['payload_bytes'] / 1024:,.0f} kB" if 'payload_bytes' in result else ''
+                peak = f", +{result['rss_growth_mb']:,.0f} MB" if 'rss_growth_mb' in result else ''
+                print(f"  {stage:<10}{result['seconds']:8.2f} s{peak}{extra}", flush=True)
+    finally:
+        shutil.rmtree(store_dir, ignore_errors=True)
+
+    os.makedirs(args.output, exist_ok=True)
+    path = os.path.join(args.output, f'{label}.json')
+    with open(path, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f'Resultados em {path}')
+    return 0
+
+
+# Compara duas execuções, etapa por etapa. Termina com código 1 se alguma
+# etapa ficou mais lenta que o limite
+def compare(args):
+    with open(args.before) as f:
+        before = json.load(f)
+    with open(args.after) as f:
+        after = json.load(f)
+
+    regressions = 0
+    print(f"{'pacotes':>12}  {'etapa':<10}{before['label']:>14}{after['label']:>14}{'variação':>10}")
+    for rows, stages in after['captures'].items():
+        for stage, result in stages.items():
+            previous = before['captures'].get(rows, {}).get(stage)
+            if previous is None:
+                continue
+            change = result['seconds'] / max(previous['seconds'], 1e-9) - 1
+            slower = change > args.threshold
+            regressions += slower
+            print(f"{int(rows):>12,}  {stage:<10}{previous['seconds']:>12.2f} s{result['seconds']:>12.2f} s"
+                  f"{change:>+10.0%}{'  regressão' if slower else ''}")
+    return 1 if regressions else 0
+
+
+# Importa o dashboard em processos novos, como na partida de um worker.
+# Termina com código 1 se a mediana passar do limite ou se algum módulo
+# pesado for carregado na importação
+def imports(args):
+    script = ('import sys, time\n'
+              'started = time.perf_counter()\n'
+              'import dashboard_8\n'
+              'print(time.perf_counter() - started)\n'
+              f'print(",".join(name for name in {HEAVY_MODULES!r} if name in sys.modules))\n')
+    times, loaded = [], set()
+    for _ in range(args.repeat):
+        with tempfile.TemporaryDirectory(prefix='analise-benchmark-') as directory:
+            result = subprocess.run([sys.executable, '-c', script], capture_output=True, text=True, check=True,
+                                    cwd=os.path.dirname(os.path.abspath(__file__)),
+                                    env={**os.environ, 'ANALISE_DATA_DIR': directory})
+        seconds, modules = result.stdout.split('\n')[-3:-1]
+        times.append(float(seconds))
+        loaded.update(filter(None, modules.split(',')))
+
+    median = sorted(times)[len(times) // 2]
+    print(f'Importação do dashboard: mediana de {median:.2f} s em {len(times)} processos '
+          f'(limite: {args.budget:.2f} s)')
+    if loaded:
+        print(f"Módulos pesados carregados na importação: {', '.join(sorted(loaded))}")
+    return 1 if median > args.budget or loaded else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmarks da ingestão e das abas do dashboard.')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = commands.add_parser('run', help='executa os benchmarks')
+    run_parser.add_argument('--rows', default='10k,1M',
+                            help=f'tamanhos das capturas, separados por vírgula (referência: {",".join(SIZES)})')
+    run_parser.add_argument('--label', help='nome da execução (padrão: git describe)')
+    run_parser.add_argument('--output', default=BENCHMARK_DIR, help='diretório dos resultados')
+    run_parser.add_argument('--data-dir', default=os.path.join(tempfile.gettempdir(), 'analise-benchmark-data'),
+                            help='diretório das capturas sintéticas, geradas uma única vez')
+    run_parser.add_argument('--no-memory', action='store_true',
+                            help='não mede a memória residente')
+    run_parser.set_defaults(handler=run)
+
+    compare_parser = commands.add_parser('compare', help='compara duas execuções')
+    compare_parser.add_argument('before')
+    compare_parser.add_argument('after')
+    compare_parser.add_argument('--threshold', type=float, default=REGRESSION_THRESHOLD,
+                                help='aumento de tempo tratado como regressão (padrão: 0.2, ou 20%%)')
+    compare_parser.set_defaults(handler=compare)
+
+    imports_parser = commands.add_parser('imports', help='mede o tempo de importação do dashboard')
+    imports_parser.add_argument('--repeat', type=int, default=5, help='processos medidos')
+    imports_parser.add_argument('--budget', type=float, default=IMPORT_BUDGET_SECONDS,
+                                help=f'tempo máximo, em segundos (padrão: {IMPORT_BUDGET_SECONDS:g})')
+    imports_parser.set_defaults(handler=imports)
+
+    args = parser.parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
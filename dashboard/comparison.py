@@ -0,0 +1,47 @@
+# Comparação entre cenários, montada só com os agregados guardados de cada
+# captura, sem tocar nos pacotes
+import lazy
+
+pd = lazy.module('pandas')
+
+
+# Linhas no formato longo, uma por (cenário, valor), com os valores que
+# aparecem entre os top de qualquer um dos cenários. Valores ausentes de um
+# cenário contam zero
+def _top_values(scenarios, attribute, column, top):
+    frames = {label: getattr(aggregates, attribute).set_index(column) for label, aggregates in scenarios}
+    values = pd.Index(pd.unique(pd.concat([frame.index[:top].to_series() for frame in frames.values()])))
+    rows = []
+    for label, frame in frames.items():
+        selected = frame.reindex(values)
+        selected["Count"] = selected["Count"].fillna(0).astype('int64')
+        selected["Cenário"] = label
+        rows.append(selected.rename_axis(column).reset_index())
+    return pd.concat(rows, ignore_index=True)
+
+
+def compare_protocols(scenarios, top=13):
+    frame = _top_values(scenarios, 'protocol_counts', 'Protocol', top)
+    frame["Percentage"] = frame["Percentage"].fillna(0.0)
+    return frame
+
+
+def compare_sources(scenarios, top=10):
+    return _top_values(scenarios, 'source_counts', 'Source', top)
+
+
+# Pacotes por protocolo de cada cenário e a diferença para o primeiro, em
+# pacotes e em pontos percentuais da captura
+def count_differences(scenarios):
+    (base_label, _), *others = scenarios
+    counts = pd.concat({label: aggregates.protocol_counts.set_index("Protocol")["Count"]
+                        for label, aggregates in scenarios}, axis=1).fillna(0).astype('int64')
+    counts = counts.sort_values(base_label, ascending=False, kind='stable')
+    totals = pd.Series({label: aggregates.packet_count for label, aggregates in scenarios})
+    shares = counts / totals.clip(lower=1) * 100
+
+    table = counts.copy()
+    for label, _ in others:
+        table[f"Δ {label}"] = counts[label] - counts[base_label]
+        table[f"Δ p.p. {label}"] = (shares[label] - shares[base_label]).round(2)
+    return table.rename_axis("Protocol").reset_index()
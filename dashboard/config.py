@@ -0,0 +1,49 @@
+import os
+
+# Diretório do armazenamento colunar das capturas já ingeridas
+DATA_DIR = os.environ.get('ANALISE_DATA_DIR',
+                          os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data'))
+
+# Descarta a coluna Info na ingestão (geralmente a maior parte da memória)
+DROP_INFO = os.environ.get('ANALISE_DROP_INFO', '0') == '1'
+
+# Memória máxima, em MB, ocupada pelas capturas abertas. As usadas há mais
+# tempo são descartadas da memória e reabertas do disco quando necessário
+MEMORY_BUDGET_MB = int(os.environ.get('ANALISE_MEMORY_BUDGET_MB', '2048'))
+
+# Memória máxima, em MB, das ordens de linhas guardadas por cada tabela
+# paginada (filtros e ordenações já consultados)
+TABLE_VIEWS_MB = int(os.environ.get('ANALISE_TABLE_VIEWS_MB', '256'))
+
+# Cache do gerenciador de callbacks em segundo plano (ingestão das capturas)
+JOBS_DIR = os.environ.get('ANALISE_JOBS_DIR', os.path.join(DATA_DIR, 'jobs'))
+
+# Diretório com capturas sendo gravadas (CSV ou pcap), acompanhadas ao vivo.
+# Sem ele, o modo ao vivo fica desativado
+LIVE_DIR = os.environ.get('ANALISE_LIVE_DIR')
+
+# Pacotes mais recentes de uma captura ao vivo mantidos para a tabela de detalhes
+LIVE_WINDOW_ROWS = int(os.environ.get('ANALISE_LIVE_WINDOW_ROWS', '100000'))
+
+# Contagens aproximadas de protocolos e dispositivos, com memória constante,
+# para capturas com muitos milhões de endereços. Guarda os HEAVY_HITTERS
+# valores mais frequentes de cada coluna, com o erro máximo de cada contagem
+APPROXIMATE_COUNTS = os.environ.get('ANALISE_APPROXIMATE_COUNTS', '0') == '1'
+HEAVY_HITTERS = int(os.environ.get('ANALISE_HEAVY_HITTERS', '1000'))
+
+# Tempos e tamanhos de resposta dos callbacks, somados entre os processos
+METRICS_DIR = os.environ.get('ANALISE_METRICS_DIR', os.path.join(DATA_DIR, 'metrics'))
+
+# Painel de depuração no fim da página, com os tempos da última chamada de
+# cada callback e o pedido de perfil de uma chamada
+DEBUG_PANEL = os.environ.get('ANALISE_DEBUG_PANEL', '0') == '1'
+
+# Perfis de chamadas únicas: cProfile (arquivos .prof) ou pyinstrument
+# (páginas .html, requer o pacote pyinstrument)
+PROFILE_DIR = os.environ.get('ANALISE_PROFILE_DIR', os.path.join(DATA_DIR, 'profiles'))
+PROFILER = os.environ.get('ANALISE_PROFILER', 'cprofile')
+
+# Conteúdo das abas já serializado, em disco, com os menos usados descartados
+# acima de FIGURE_CACHE_MB
+FIGURE_CACHE_DIR = os.environ.get('ANALISE_FIGURE_CACHE_DIR', os.path.join(DATA_DIR, 'figures'))
+FIGURE_CACHE_MB = int(os.environ.get('ANALISE_FIGURE_CACHE_MB', '512'))
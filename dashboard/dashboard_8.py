@@ -1,139 +1,373 @@
-import pandas as pd
+import uuid
+
+import diskcache
 import dash
-from dash import dcc, html
+from dash import DiskcacheManager, dcc, html
 from dash.dependencies import Input, Output, State
 from dash import dash_table
-import plotly.express as px
-import plotly.figure_factory as ff
-import io
-import base64
+import plotly.graph_objects as go
+from dash.exceptions import PreventUpdate
+
+import comparison
+import config
+import distribution
+import figure_cache
+import figures
+import flows
+import graph
+import lazy
+import live
+import metrics
+import throughput
+import timeline
+from datasets import DatasetRegistry
+from table import PAGE_SIZE, TableViews
+
+np = lazy.module('numpy')
+px = lazy.module('plotly.express')
+
+# Ingestão das capturas em processos separados, fora das requisições
+background_callback_manager = DiskcacheManager(diskcache.Cache(config.JOBS_DIR))
 
 # Inicializar Dash app
-app = dash.Dash(__name__)
+app = dash.Dash(__name__, background_callback_manager=background_callback_manager)
+
+# Servidor Flask, para rodar com vários workers (ex.: gunicorn dashboard_8:server)
+server = app.server
+
+# Capturas carregadas, indexadas pelo digest do arquivo
+registry = DatasetRegistry()
+
+# Páginas da tabela de detalhes, montadas no servidor
+table_views = TableViews()
+
+# Páginas da tabela de conversas
+flow_views = TableViews(frame=flows.flow_table)
+
+# Capturas ao vivo do diretório configurado
+live_sources = live.LiveSources()
+
+# Intervalo de atualização do painel de depuração
+DEBUG_REFRESH_MS = 5000
+
+# Conteúdo das abas já serializado, compartilhado entre os workers
+tab_cache = figure_cache.FigureCache()
+
+# Tempos por etapa e tamanhos das respostas dos callbacks, expostos em /metrics
+callback_metrics = metrics.Metrics()
+callback_metrics.init_app(server)
+
+
+# Opções do menu de cenários, a partir do catálogo de capturas da sessão
+def scenario_options(session):
+    return [{'label': f"Cenário {i} ({scenario['name']})" if scenario['name'] else f"Cenário {i}",
+             'value': scenario['digest']}
+            for i, scenario in enumerate(registry.scenarios(session), start=1)]
 
-# Inicializar DataFrames
-df1 = pd.DataFrame()
-df2 = pd.DataFrame()
 
 # Definir layout
-app.layout = html.Div(style={'backgroundColor': 'lightblue', 'text-align': 'center'}, children=[
-    html.H1("Análise de redes - PUC Minas",
-            style={'color': 'white', 'background-color': 'blue', 'padding': '20px', 'margin-bottom': '0'}),
-
-    # Upload dos arquivos
-    dcc.Upload(
-        id='upload-data-1',
-        children=html.Div([
-            'Arraste e solte ou ',
-            html.A('selecione o arquivo CSV do primeiro cenário')
-        ]),
-        style={
-            'width': '50%',
-            'height': '60px',
-            'lineHeight': '60px',
-            'borderWidth': '1px',
-            'borderStyle': 'dashed',
-            'borderRadius': '5px',
-            'textAlign': 'center',
-            'margin': '10px'
-        },
-        multiple=False
-    ),
-    dcc.Upload(
-        id='upload-data-2',
-        children=html.Div([
-            'Arraste e solte ou ',
-            html.A('selecione o arquivo CSV do segundo cenário')
+# O layout é montado a cada carregamento da página, com um novo id de sessão
+# que só é usado se o navegador ainda não tiver um
+def serve_layout():
+    return html.Div(style={'backgroundColor': 'lightblue', 'text-align': 'center'}, children=[
+        html.H1("Análise de redes - PUC Minas",
+                style={'color': 'white', 'background-color': 'blue', 'padding': '20px', 'margin-bottom': '0'}),
+
+        # Sessão do usuário. Os cenários de cada sessão ficam no catálogo em
+        # disco, compartilhado entre os processos do servidor
+        dcc.Store(id='session-id', storage_type='local', data=uuid.uuid4().hex),
+
+        # Upload dos arquivos
+        # Cada arquivo enviado vira um novo cenário
+        dcc.Upload(
+            id='upload-data',
+            children=html.Div([
+                'Arraste e solte ou ',
+                html.A('selecione os arquivos CSV ou pcap dos cenários')
+            ]),
+            style={
+                'width': '50%',
+                'height': '60px',
+                'lineHeight': '60px',
+                'borderWidth': '1px',
+                'borderStyle': 'dashed',
+                'borderRadius': '5px',
+                'textAlign': 'center',
+                'margin': '10px'
+            },
+            multiple=True
+        ),
+
+        # Andamento da leitura dos arquivos enviados
+        html.Progress(id='ingest-progress', value='0', max='100', style={'display': 'none'}),
+        html.Div(id='ingest-status'),
+
+        # Digests das capturas do último envio: as já lidas, durante a
+        # leitura, e todas, ao terminar
+        dcc.Store(id='ingest-ready'),
+        dcc.Store(id='ingested-dataset'),
+
+        # Dropdown menu para selecionar qual arquivo analisar
+        dcc.Dropdown(
+            id='file-selector',
+            options=[],
+            persistence=True,
+            style={'width': '50%', 'margin': '10px'}
+        ),
+
+        # Janela de tempo analisada, em segundos da coluna Time
+        html.Div(dcc.RangeSlider(id='time-window', min=0, max=1, step=1, value=None, marks=None,
+                                 allowCross=False, tooltip={'placement': 'bottom'}),
+                 style={'width': '50%', 'margin': '10px'}),
+
+        # Leitura periódica da captura ao vivo selecionada
+        dcc.Interval(id='live-interval', interval=live.POLL_INTERVAL_MS, disabled=True),
+        dcc.Store(id='live-dataset'),
+
+        # Abas
+        # Cada aba tem seu próprio conteúdo e callback
+        dcc.Tabs(id='tabs', value='tab1', children=[
+            dcc.Tab(label='Visão Geral dos Pacotes', value='tab1', children=html.Div(id='tab1-content')),
+            dcc.Tab(label='Detalhes dos Pacotes', value='tab2', children=html.Div([
+                html.Div(id='tab2-content'),
+                # Paginação, ordenação e filtro são feitos no servidor
+                dash_table.DataTable(
+                    id='packet-details-table',
+                    columns=[],
+                    page_current=0,
+                    page_size=PAGE_SIZE,
+                    page_action='custom',
+                    sort_action='custom',
+                    sort_mode='multi',
+                    sort_by=[],
+                    filter_action='custom',
+                    filter_query='',
+                    style_table={'overflowX': 'auto'},
+                    style_cell={'width': '150px', 'textAlign': 'left'},
+                ),
+            ])),
+            dcc.Tab(label='Métricas Estatísticas', value='tab3', children=html.Div(id='tab3-content')),
+            dcc.Tab(label='Vazão', value='tab4', children=html.Div([
+                html.Div(id='tab4-content'),
+                dcc.RadioItems(id='throughput-metric', options=['Pacotes/s', 'Bytes/s'], value='Pacotes/s',
+                               inline=True),
+                # O zoom escolhe a resolução das curvas
+                dcc.Graph(id='throughput-graph'),
+            ])),
+            dcc.Tab(label='Conversas', value='tab5', children=html.Div([
+                html.Div(id='tab5-content'),
+                # Paginação, ordenação e filtro são feitos no servidor
+                dash_table.DataTable(
+                    id='flow-table',
+                    columns=[],
+                    page_current=0,
+                    page_size=PAGE_SIZE,
+                    page_action='custom',
+                    sort_action='custom',
+                    sort_mode='multi',
+                    sort_by=[],
+                    filter_action='custom',
+                    filter_query='',
+                    style_table={'overflowX': 'auto'},
+                    style_cell={'width': '150px', 'textAlign': 'left'},
+                ),
+            ])),
+            dcc.Tab(label='Grafo da Rede', value='tab6', children=html.Div(id='tab6-content')),
+            dcc.Tab(label='Comparação', value='tab7', children=html.Div([
+                # Cenários comparados; o primeiro é a referência das diferenças
+                dcc.Dropdown(id='compare-selector', options=[], multi=True, persistence=True,
+                             placeholder='Selecione dois ou mais cenários',
+                             style={'width': '50%', 'margin': '10px'}),
+                html.Div(id='tab7-content'),
+            ])),
         ]),
-        style={
-            'width': '50%',
-            'height': '60px',
-            'lineHeight': '60px',
-            'borderWidth': '1px',
-            'borderStyle': 'dashed',
-            'borderRadius': '5px',
-            'textAlign': 'center',
-            'margin': '10px'
-        },
-        multiple=False
-    ),
-
-    # Dropdown menu para selecionar qual arquivo analisar
-    dcc.Dropdown(
-        id='file-selector',
-        options=[
-            {'label': 'Cenário 1', 'value': 'df1'},
-            {'label': 'Cenário 2', 'value': 'df2'},
-        ],
-        value='df1',  # Default selection
-        style={'width': '50%', 'margin': '10px'}
-    ),
-
-    # Abas
-    dcc.Tabs(id='tabs', value='tab1', children=[
-        dcc.Tab(label='Visão Geral dos Pacotes', value='tab1'),
-        dcc.Tab(label='Detalhes dos Pacotes', value='tab2'),
-        dcc.Tab(label='Métricas Estatísticas', value='tab3'),
-    ]),
-
-    # Tab content
-    html.Div(id='tabs-content'),
-])
+
+        debug_panel() if config.DEBUG_PANEL else None,
+    ])
+
+
+# Painel de depuração: tempos por etapa da última chamada de cada callback,
+# atualizados periodicamente, e o pedido de perfil da próxima chamada
+def debug_panel():
+    return html.Details(style={'textAlign': 'left', 'margin': '10px'}, children=[
+        html.Summary("Depuração"),
+        dcc.Interval(id='debug-interval', interval=DEBUG_REFRESH_MS),
+        html.Div(id='debug-content'),
+        dcc.Dropdown(id='profile-callback', options=sorted(callback_metrics.instrumented),
+                     placeholder='Callback a perfilar', style={'width': '50%', 'margin': '10px 0'}),
+        html.Button("Perfilar a próxima chamada", id='profile-button'),
+        html.Div(id='profile-status'),
+    ])
+
+
+app.layout = serve_layout
 
 
 # Callback para tratar arquivos csv
-@app.callback(Output('tabs-content', 'children'),
-              Input('tabs', 'value'),
-              Input('upload-data-1', 'contents'),
-              Input('upload-data-2', 'contents'),
-              State('upload-data-1', 'filename'),
-              State('upload-data-2', 'filename'),
+# Roda em segundo plano e informa o andamento da leitura. O arquivo é lido
+# uma única vez por upload; as abas usam apenas o digest. Cada captura
+# entra no menu de cenários assim que seus agregados ficam prontos, sem
+# esperar as demais do mesmo envio
+@app.callback(Output('ingested-dataset', 'data'),
+              Input('upload-data', 'contents'),
+              State('upload-data', 'filename'),
+              State('session-id', 'data'),
+              background=True,
+              running=[(Output('upload-data', 'disabled'), True, False),
+                       (Output('ingest-progress', 'style'), {'width': '50%'}, {'display': 'none'})],
+              progress=[Output('ingest-progress', 'value'), Output('ingest-status', 'children'),
+                        Output('ingest-ready', 'data')],
+              prevent_initial_call=True)
+@callback_metrics.instrument
+def ingest_uploads(set_progress, contents, filenames, session):
+    if not contents:
+        raise PreventUpdate
+
+    ready = []
+    for i, (content, filename) in enumerate(zip(contents, filenames), start=1):
+        label = f"{filename} ({i}/{len(contents)})"
+
+        def report(rows, fraction, rows_per_second):
+            set_progress((str(round(fraction * 100)),
+                          f"Lendo {label}: {fraction:.0%}, {rows:,} pacotes ({rows_per_second:,.0f} pacotes/s)",
+                          ready))
+
+        set_progress(('0', f"Recebendo {label}", ready))
+        ready = ready + [registry.load(content, filename, session, progress=report).digest]
+        set_progress(('100', f"{label} carregado", ready))
+
+    set_progress(('100', f"{len(contents)} arquivo(s) carregado(s)", ready))
+    return ready
+
+
+# Callback para listar os cenários da sessão. A lista é refeita a cada
+# captura pronta de um envio (ingest-ready) e ao fim dele
+@app.callback(Output('file-selector', 'options'),
+              Output('file-selector', 'value'),
+              Output('compare-selector', 'options'),
+              Input('session-id', 'data'),
+              Input('ingest-ready', 'data'),
+              Input('ingested-dataset', 'data'),
+              State('file-selector', 'value'))
+@callback_metrics.instrument
+def update_scenarios(session, ready, ingested, selected_file):
+    if session is None:
+        raise PreventUpdate
+
+    uploaded = scenario_options(session)
+    # As capturas ao vivo aparecem para todas as sessões
+    options = uploaded + live_sources.options()
+
+    # Ao fim de um envio, seleciona a primeira captura dele, se nenhuma
+    # outra do mesmo envio foi escolhida enquanto as demais eram lidas
+    if dash.callback_context.triggered_id == 'ingested-dataset' and ingested and selected_file not in ingested:
+        return options, ingested[0], options
+
+    # Mantém o cenário escolhido antes, se ele ainda pertence à sessão
+    if any(option['value'] == selected_file for option in options):
+        return options, dash.no_update, options
+    # Sem cenário escolhido, fica o último carregado: durante um envio, a
+    # captura que acabou de ficar pronta
+    return options, uploaded[-1]['value'] if uploaded else None, options
+
+
+# Liga a leitura periódica apenas com uma captura ao vivo selecionada
+@app.callback(Output('live-interval', 'disabled'),
               Input('file-selector', 'value'))
-def update_tab(tab_name, contents1, contents2, filename1, filename2, selected_file):
-    global df1, df2  # Make df1 and df2 global to update them
+@callback_metrics.instrument
+def toggle_live_interval(selected_file):
+    return not live.is_live(selected_file)
 
-    # Atualizar df1
-    if contents1 is not None:
-        content_type, content_string = contents1.split(',')
-        decoded = io.StringIO(base64.b64decode(content_string).decode('utf-8'))
-        df1 = pd.read_csv(decoded)
 
-    # Atualizar df2
-    if contents2 is not None:
-        content_type, content_string = contents2.split(',')
-        decoded = io.StringIO(base64.b64decode(content_string).decode('utf-8'))
-        df2 = pd.read_csv(decoded)
+# Lê os pacotes novos da captura ao vivo. As abas só são refeitas quando
+# chegam pacotes
+@app.callback(Output('live-dataset', 'data'),
+              Input('live-interval', 'n_intervals'),
+              State('file-selector', 'value'),
+              State('live-dataset', 'data'))
+@callback_metrics.instrument
+def poll_live_capture(n_intervals, selected_file, current):
+    if not live.is_live(selected_file):
+        raise PreventUpdate
+    dataset = live_sources.poll(selected_file)
+    if dataset is None or dataset.digest == current:
+        raise PreventUpdate
+    return dataset.digest
 
-    # Determinar qual arquivo usar
-    selected_df = df1 if selected_file == 'df1' else df2
 
-    # verfica se arquivo não está vazio
-    if selected_df.empty:
-        return [html.Div(html.H3("Selecione um arquivo para análise."))]
+# Ajusta o seletor de janela à captura escolhida, começando pela captura
+# inteira. As capturas ao vivo são sempre analisadas por inteiro
+@app.callback(Output('time-window', 'min'),
+              Output('time-window', 'max'),
+              Output('time-window', 'value'),
+              Output('time-window', 'disabled'),
+              Input('file-selector', 'value'))
+@callback_metrics.instrument
+def update_time_window(selected_file):
+    aggregates = None if live.is_live(selected_file) else registry.aggregates(selected_file)
+    if aggregates is None or aggregates.time_bounds is None:
+        return 0, 1, None, True
+    first, last = aggregates.time_bounds
+    return first, last, [first, last], False
+
+
+# Captura de um valor do menu de cenários: carregada ou ao vivo
+def get_dataset(selected_file):
+    if live.is_live(selected_file):
+        return live_sources.poll(selected_file)
+    return registry.get(selected_file)
+
+
+# Determinar qual arquivo usar
+def selected_dataset(tab_name, active_tab, selected_file):
+    # Só monta a aba visível; as demais são atualizadas quando selecionadas
+    if tab_name != active_tab:
+        raise PreventUpdate
+    return get_dataset(selected_file)
+
+
+# Agregados do cenário da aba visível. Nas capturas carregadas, vêm do
+# armazenamento sem abrir o frame, que só é lido se a vista não estiver no
+# cache das abas
+def selected_aggregates(tab_name, active_tab, selected_file):
+    if tab_name != active_tab:
+        raise PreventUpdate
+    if live.is_live(selected_file):
+        dataset = live_sources.poll(selected_file)
+        return None if dataset is None else dataset.aggregates
+    return registry.aggregates(selected_file)
+
+
+def empty_tab():
+    return [html.Div(html.H3("Selecione um arquivo para análise."))]
+
 
-    if tab_name == 'tab1':
+# Aviso exibido quando as contagens vêm do modo aproximado
+def approximation_note(*counts):
+    error = max((int(frame["Error"].max()) for frame in counts if "Error" in frame and len(frame)), default=0)
+    if error == 0:
+        return None
+    return html.P(f"Contagens aproximadas: cada barra pode estar superestimada em até {error:,} pacotes.")
 
-        protocol_counts = selected_df["Protocol"].value_counts().reset_index()
-        protocol_counts.columns = ["Protocol", "Count"]
-        protocol_counts["Percentage"] = (protocol_counts["Count"] / len(selected_df)) * 100
-        # Ordena em ordem descendente
-        protocol_counts_sorted = protocol_counts.sort_values(by="Percentage", ascending=False)
 
-        # Seleciona top 10
-        protocol_counts_top10 = protocol_counts_sorted.head(13)
+# Conteúdo da aba de visão geral
+def overview_tab(dataset, window):
+    aggregates = timeline.window_aggregates(dataset, window)
+    protocol_counts_sorted = aggregates.protocol_counts
 
-        # Criar DataFrame para 'Source' e sua contagem 
-        source_counts = selected_df["Source"].value_counts().reset_index()
-        source_counts.columns = ["Source", "Count"]
+    # Seleciona top 10
+    protocol_counts_top10 = protocol_counts_sorted.head(13)
 
-        # Seleciona top 10
-        source_counts_top10 = source_counts.head(10)
+    # Seleciona top 10
+    source_counts_top10 = aggregates.source_counts.head(10)
 
+    with metrics.stage('figure'):
         return [
             # Numero de pacotes
             html.Div([
                 html.H3("Numero de Pacotes Capturados"),
-                html.H4(len(selected_df)),
+                html.H4(aggregates.packet_count),
+                approximation_note(protocol_counts_top10, source_counts_top10),
             ]),
             # Gráfico de barras - Porcentage do Total Packets (Top 13)
             dcc.Graph(
@@ -146,78 +380,408 @@ def update_tab(tab_name, contents1, contents2, filename1, filename2, selected_fi
                             labels={'Source': 'Device IP', 'Count': 'Number of Packets'}),
             ),
         ]
-    elif tab_name == 'tab2':
-        return [
-            # Detalhamento dos pacotes
-            html.Div([
-                html.H3("Detalhes dos Pacotes"),
-                dash_table.DataTable(
-                    id='packet-details-table',
-                    columns=[{"name": i, "id": i}
-                             for i in selected_df.columns],
-                    data=selected_df.to_dict('records'),
-                    style_table={'overflowX': 'auto'},
-                    style_cell={'width': '150px', 'textAlign': 'left'},
-                )
-            ]),
-        ]
-    elif tab_name == 'tab3':
-        # Estatísticas sobre o comprimento dos pacotes
-        packet_length_stats = selected_df["Length"].describe()
-
-        # Estatísticas sobre o tempo entre chegadas de pacotes
-        inter_arrival_time_stats = selected_df["Time"].diff().describe()
-
-        # Inclua as interpretações na apresentação
-        interpretation_table = html.Table(
-            # Cabeçalho
-            [html.Tr([html.Th(col) for col in ['Métrica', 'Comprimento do Pacote', 'Intervalo entre Chegadas']])] +
-            # Linhas
-            [html.Tr([
-                html.Td(metric),
-                html.Td(packet_length_stats[metric]),
-                html.Td(inter_arrival_time_stats[metric]),
-             ]) for metric in ['mean', '50%', 'std']],
-            style={'width': '100%'}
-        )
-
-        # Tamanho dos pacotes Distribution
-        packet_size_distribution = ff.create_distplot([selected_df["Length"]],
-                                                    group_labels=["Packet Size"],
-                                                    bin_size=10,
-                                                    show_hist=False,  # Show histogram
-                                                    show_rug=False,  # Hide rug plot
-                                                    histnorm='',
-                                                    )
-        packet_size_distribution.update_layout(
-            title_text="Distribuição do Tamanho dos Pacotes",
-            xaxis=dict(title="Comprimento do Pacote")
-        )
-        packet_size_distribution.update_yaxes(showticklabels=False)
-
-        # Tempos de chegada Distribution
-        inter_arrival_time_distribution = ff.create_distplot([selected_df["Time"].diff().dropna()],
-                                                            group_labels=["Inter-Arrival Time"],
-                                                            bin_size=0.01,
-                                                            show_hist=False,
-                                                            show_rug=False,
-                                                            histnorm='',
-                                                            )
-        inter_arrival_time_distribution.update_layout(
-            title_text="Distribuição dos Tempos de Chegada",
-            xaxis=dict(title="Intervalo entre Chegadas")
-        )
-        inter_arrival_time_distribution.update_yaxes(showticklabels=False)
-
-        # Adicione os histogramas e interpretações à aba de estatísticas
-        return [
-            html.Div([
-                html.H3("Métricas Estatísticas"),
-                interpretation_table,
-                dcc.Graph(figure=packet_size_distribution),
-                dcc.Graph(figure=inter_arrival_time_distribution),
-            ]),
-        ]
+
+
+# Callback para a aba de visão geral
+@app.callback(Output('tab1-content', 'children'),
+              Input('tabs', 'value'),
+              Input('file-selector', 'value'),
+              Input('live-dataset', 'data'),
+              Input('time-window', 'value'))
+@callback_metrics.instrument
+def update_overview_tab(tab_name, selected_file, live_dataset, window):
+    aggregates = selected_aggregates(tab_name, 'tab1', selected_file)
+
+    # verfica se arquivo não está vazio
+    if aggregates is None or aggregates.packet_count == 0:
+        return empty_tab()
+
+    span = timeline.time_span(aggregates, window)
+    return tab_cache.view(selected_file, 'tab1', span, lambda: overview_tab(get_dataset(selected_file), window))
+
+
+# Callback para a aba de detalhes
+@app.callback(Output('tab2-content', 'children'),
+              Output('packet-details-table', 'columns'),
+              Output('packet-details-table', 'page_current'),
+              Input('tabs', 'value'),
+              Input('file-selector', 'value'),
+              Input('time-window', 'value'))
+@callback_metrics.instrument
+def update_details_tab(tab_name, selected_file, window):
+    dataset = selected_dataset(tab_name, 'tab2', selected_file)
+
+    if dataset is None or dataset.aggregates.packet_count == 0:
+        return empty_tab(), [], 0
+
+    # Detalhamento dos pacotes
+    columns = [{"name": i, "id": i} for i in dataset.df.columns]
+    return [html.H3("Detalhes dos Pacotes")], columns, 0
+
+
+# Callback para a página visível da tabela de detalhes
+@app.callback(Output('packet-details-table', 'data'),
+              Output('packet-details-table', 'page_count'),
+              Input('packet-details-table', 'page_current'),
+              Input('packet-details-table', 'page_size'),
+              Input('packet-details-table', 'sort_by'),
+              Input('packet-details-table', 'filter_query'),
+              Input('time-window', 'value'),
+              State('file-selector', 'value'))
+@callback_metrics.instrument
+def update_packet_page(page_current, page_size, sort_by, filter_query, window, selected_file):
+    dataset = get_dataset(selected_file)
+
+    if dataset is None:
+        return [], 1
+
+    return table_views.page(dataset, page_current or 0, page_size, filter_query, sort_by, window)
+
+
+# Curva de densidade calculada a partir do histograma da ingestão
+def distribution_figure(histogram, label):
+    with metrics.stage('figure'):
+        x, y = distribution.kde_curve(histogram)
+        return go.Figure(figures.scatter(x, y, mode='lines', name=label, showlegend=True))
+
+
+# Comprimento de cada pacote ao longo do tempo, reduzido no servidor. Sem
+# janela, os pontos reduzidos da captura inteira são calculados uma vez
+def length_time_figure(dataset, window):
+    span = timeline.time_span(dataset.aggregates, window)
+    if span is None:
+        times, lengths = dataset.derived('length_time_points', lambda df: figures.minmax_downsample(
+            df["Time"].to_numpy(), df["Length"].to_numpy()))
+    else:
+        times, lengths = timeline.time_index(dataset).values(dataset.df, *span)
+
+    with metrics.stage('figure'):
+        figure = go.Figure(figures.scatter(times, lengths, mode='markers', marker=dict(size=3), name="Packet Size"))
+        figure.update_layout(title_text="Comprimento dos Pacotes ao Longo do Tempo",
+                             xaxis=dict(title="Tempo (s)"), yaxis=dict(title="Comprimento do Pacote"))
+    return figure
+
+
+# Conteúdo da aba de métricas estatísticas
+def statistics_tab(dataset, window):
+    aggregates = timeline.window_aggregates(dataset, window)
+
+    # Estatísticas sobre o comprimento dos pacotes
+    packet_length_stats = aggregates.length_stats
+
+    # Estatísticas sobre o tempo entre chegadas de pacotes
+    inter_arrival_time_stats = aggregates.inter_arrival_time_stats
+
+    # Inclua as interpretações na apresentação
+    interpretation_table = html.Table(
+        # Cabeçalho
+        [html.Tr([html.Th(col) for col in ['Métrica', 'Comprimento do Pacote', 'Intervalo entre Chegadas']])] +
+        # Linhas
+        [html.Tr([
+            html.Td(metric),
+            html.Td(packet_length_stats[metric]),
+            html.Td(inter_arrival_time_stats[metric]),
+         ]) for metric in ['mean', '50%', 'std']],
+        style={'width': '100%'}
+    )
+
+    # Tamanho dos pacotes Distribution
+    packet_size_distribution = distribution_figure(aggregates.length_histogram, "Packet Size")
+    packet_size_distribution.update_layout(
+        title_text="Distribuição do Tamanho dos Pacotes",
+        xaxis=dict(title="Comprimento do Pacote")
+    )
+    packet_size_distribution.update_yaxes(showticklabels=False)
+
+    # Tempos de chegada Distribution
+    inter_arrival_time_distribution = distribution_figure(aggregates.inter_arrival_time_histogram, "Inter-Arrival Time")
+    inter_arrival_time_distribution.update_layout(
+        title_text="Distribuição dos Tempos de Chegada",
+        xaxis=dict(title="Intervalo entre Chegadas")
+    )
+    inter_arrival_time_distribution.update_yaxes(showticklabels=False)
+
+    # Adicione os histogramas e interpretações à aba de estatísticas
+    return [
+        html.Div([
+            html.H3("Métricas Estatísticas"),
+            interpretation_table,
+            dcc.Graph(figure=packet_size_distribution),
+            dcc.Graph(figure=inter_arrival_time_distribution),
+            dcc.Graph(figure=length_time_figure(dataset, window)),
+        ]),
+    ]
+
+
+# Callback para a aba de métricas estatísticas
+@app.callback(Output('tab3-content', 'children'),
+              Input('tabs', 'value'),
+              Input('file-selector', 'value'),
+              Input('live-dataset', 'data'),
+              Input('time-window', 'value'))
+@callback_metrics.instrument
+def update_statistics_tab(tab_name, selected_file, live_dataset, window):
+    aggregates = selected_aggregates(tab_name, 'tab3', selected_file)
+
+    if aggregates is None or aggregates.packet_count == 0:
+        return empty_tab()
+
+    span = timeline.time_span(aggregates, window)
+    return tab_cache.view(selected_file, 'tab3', span, lambda: statistics_tab(get_dataset(selected_file), window))
+
+
+# Intervalo do eixo x depois de um zoom no gráfico, ou None
+def zoom_range(relayout_data):
+    if relayout_data and 'xaxis.range[0]' in relayout_data:
+        return float(relayout_data['xaxis.range[0]']), float(relayout_data['xaxis.range[1]'])
+    if relayout_data and 'xaxis.range' in relayout_data:
+        return tuple(float(value) for value in relayout_data['xaxis.range'])
+    return None
+
+
+# Callback para a aba de vazão
+# As curvas vêm dos totais por milissegundo, segundo e minuto calculados na
+# ingestão, na resolução mais fina que cabe no intervalo visível
+@app.callback(Output('tab4-content', 'children'),
+              Output('throughput-graph', 'figure'),
+              Input('tabs', 'value'),
+              Input('file-selector', 'value'),
+              Input('live-dataset', 'data'),
+              Input('time-window', 'value'),
+              Input('throughput-metric', 'value'),
+              Input('throughput-graph', 'relayoutData'))
+@callback_metrics.instrument
+def update_throughput_tab(tab_name, selected_file, live_dataset, window, metric, relayout_data):
+    aggregates = selected_aggregates(tab_name, 'tab4', selected_file)
+
+    if aggregates is None or aggregates.packet_count == 0:
+        return empty_tab(), go.Figure()
+
+    # O zoom vale até a troca de captura ou de janela
+    span = None
+    if dash.callback_context.triggered_id in ('throughput-graph', 'throughput-metric'):
+        span = zoom_range(relayout_data)
+    if span is None:
+        span = timeline.time_span(aggregates, window) or (None, None)
+
+    return tab_cache.view(selected_file, 'tab4', (metric, span),
+                          lambda: throughput_tab(get_dataset(selected_file), span, metric, selected_file))
+
+
+# Conteúdo da aba de vazão, no intervalo span
+def throughput_tab(dataset, span, metric, selected_file):
+    level, frame = throughput.dataset_throughput(dataset).series(*span)
+    if level is None:
+        # Nenhum pacote com a coluna Protocol preenchida
+        return [html.Div(html.H3("A captura não tem pacotes com protocolo identificado."))], go.Figure()
+    figure = px.line(frame, x='Time', y=metric, color='Protocol',
+                     title=f"{metric} por Protocolo (resolução de {level.seconds:g} s)",
+                     labels={'Time': 'Tempo (s)', 'Protocol': 'Communication Protocol'})
+    # Mantém o zoom do usuário enquanto a captura não muda
+    figure.update_layout(uirevision=selected_file)
+    return [html.H3("Vazão ao Longo do Tempo")], figure
+
+
+# Callback para a aba de conversas
+@app.callback(Output('tab5-content', 'children'),
+              Output('flow-table', 'columns'),
+              Output('flow-table', 'page_current'),
+              Input('tabs', 'value'),
+              Input('file-selector', 'value'))
+@callback_metrics.instrument
+def update_flows_tab(tab_name, selected_file):
+    dataset = selected_dataset(tab_name, 'tab5', selected_file)
+
+    if dataset is None or dataset.aggregates.packet_count == 0:
+        return empty_tab(), [], 0
+
+    flow_count = len(flows.flow_table(dataset))
+    columns = [{"name": i, "id": i} for i in flows.FLOW_COLUMNS]
+    return [html.H3(f"Conversas ({flow_count:,})")], columns, 0
+
+
+# Callback para a página visível da tabela de conversas
+@app.callback(Output('flow-table', 'data'),
+              Output('flow-table', 'page_count'),
+              Input('flow-table', 'page_current'),
+              Input('flow-table', 'page_size'),
+              Input('flow-table', 'sort_by'),
+              Input('flow-table', 'filter_query'),
+              State('file-selector', 'value'))
+@callback_metrics.instrument
+def update_flow_page(page_current, page_size, sort_by, filter_query, selected_file):
+    dataset = get_dataset(selected_file)
+
+    if dataset is None:
+        return [], 1
+
+    return flow_views.page(dataset, page_current or 0, page_size, filter_query, sort_by)
+
+
+# Grafo desenhado com WebGL: as ligações em um único traço, separadas por
+# pontos vazios, e os dispositivos com tamanho pelo grau
+def graph_figure(communication):
+    x, y = communication.positions[:, 0], communication.positions[:, 1]
+    gaps = np.full(len(communication.sources), np.nan)
+    edge_x = np.column_stack([x[communication.sources], x[communication.targets], gaps]).ravel()
+    edge_y = np.column_stack([y[communication.sources], y[communication.targets], gaps]).ravel()
+
+    with metrics.stage('figure'):
+        figure = go.Figure([
+            go.Scattergl(x=edge_x, y=edge_y, mode='lines', line=dict(width=0.5, color='#888'),
+                         hoverinfo='skip', showlegend=False),
+            go.Scattergl(x=x, y=y, mode='markers', showlegend=False,
+                         marker=dict(size=4 + 2 * np.log2(communication.degree), color=communication.degree,
+                                     colorscale='Viridis', colorbar=dict(title='Grau')),
+                         text=[f"{name}<br>Grau: {degree}" for name, degree in
+                               zip(communication.names, communication.degree)],
+                         hoverinfo='text'),
+        ])
+        figure.update_layout(title_text="Comunicação entre Dispositivos", height=700,
+                             xaxis=dict(visible=False), yaxis=dict(visible=False, scaleanchor='x'))
+    return figure
+
+
+# Conteúdo da aba do grafo da rede
+def graph_tab(dataset):
+    communication = graph.communication_graph(dataset)
+    summary = f"{communication.node_count:,} dispositivos e {communication.edge_count:,} ligações"
+    if len(communication.names) < communication.node_count or len(communication.sources) < communication.edge_count:
+        summary += (f"; exibindo os {len(communication.names):,} dispositivos de maior grau"
+                    f" e {len(communication.sources):,} ligações")
+    return [
+        html.Div([
+            html.H3("Grafo da Rede"),
+            html.P(summary),
+            dcc.Graph(figure=graph_figure(communication)),
+        ]),
+    ]
+
+
+# Callback para a aba do grafo da rede
+@app.callback(Output('tab6-content', 'children'),
+              Input('tabs', 'value'),
+              Input('file-selector', 'value'))
+@callback_metrics.instrument
+def update_graph_tab(tab_name, selected_file):
+    aggregates = selected_aggregates(tab_name, 'tab6', selected_file)
+
+    if aggregates is None or aggregates.packet_count == 0:
+        return empty_tab()
+
+    return tab_cache.view(selected_file, 'tab6', None, lambda: graph_tab(get_dataset(selected_file)))
+
+
+# Callback para a aba de comparação
+# Usa apenas os agregados de cada cenário, calculados na ingestão
+@app.callback(Output('tab7-content', 'children'),
+              Input('tabs', 'value'),
+              Input('compare-selector', 'value'),
+              State('compare-selector', 'options'))
+@callback_metrics.instrument
+def update_comparison_tab(tab_name, selected_files, options):
+    if tab_name != 'tab7':
+        raise PreventUpdate
+
+    labels = {option['value']: option['label'] for option in options or []}
+    digests, scenarios = [], []
+    for selected_file in selected_files or []:
+        # Os frames das capturas carregadas não são abertos
+        if live.is_live(selected_file):
+            dataset = live_sources.poll(selected_file)
+            digest, aggregates = (None, None) if dataset is None else (dataset.digest, dataset.aggregates)
+        else:
+            digest, aggregates = selected_file, registry.aggregates(selected_file)
+        if aggregates is not None and aggregates.packet_count > 0:
+            digests.append(digest)
+            scenarios.append((labels.get(selected_file, selected_file), aggregates))
+    if len(scenarios) < 2:
+        return [html.Div(html.H3("Selecione dois ou mais cenários para comparar."))]
+
+    return tab_cache.view(tuple(digests), 'tab7', tuple(label for label, _ in scenarios),
+                          lambda: comparison_tab(scenarios))
+
+
+# Conteúdo da aba de comparação, com os cenários na ordem escolhida
+def comparison_tab(scenarios):
+    protocols = comparison.compare_protocols(scenarios)
+    sources = comparison.compare_sources(scenarios)
+    differences = comparison.count_differences(scenarios)
+
+    # Curvas de densidade de todos os cenários no mesmo gráfico
+    length_distribution = go.Figure()
+    inter_arrival_time_distribution = go.Figure()
+    for label, aggregates in scenarios:
+        length_distribution.add_traces(distribution_figure(aggregates.length_histogram, label).data)
+        inter_arrival_time_distribution.add_traces(
+            distribution_figure(aggregates.inter_arrival_time_histogram, label).data)
+    length_distribution.update_layout(title_text="Distribuição do Tamanho dos Pacotes",
+                                      xaxis=dict(title="Comprimento do Pacote"))
+    inter_arrival_time_distribution.update_layout(title_text="Distribuição dos Tempos de Chegada",
+                                                  xaxis=dict(title="Intervalo entre Chegadas"))
+    for figure in (length_distribution, inter_arrival_time_distribution):
+        figure.update_yaxes(showticklabels=False)
+
+    difference_table = html.Table(
+        [html.Tr([html.Th(column) for column in differences.columns])] +
+        [html.Tr([html.Td(f"{value:,}" if isinstance(value, (int, np.integer)) else value) for value in row])
+         for row in differences.itertuples(index=False)],
+        style={'width': '100%'}
+    )
+
+    return [
+        html.Div([
+            html.H3("Comparação entre Cenários"),
+            html.P(" | ".join(f"{label}: {aggregates.packet_count:,} pacotes" for label, aggregates in scenarios)),
+            dcc.Graph(
+                figure=px.bar(protocols, x="Percentage", y="Protocol", color="Cenário", barmode="group",
+                              orientation="h", title="Porcentagem de pacotes por Protocolo",
+                              labels={'Protocol': 'Communication Protocol', 'Percentage': 'Percentage of Total'}),
+            ),
+            dcc.Graph(
+                figure=px.bar(sources, x="Count", y="Source", color="Cenário", barmode="group",
+                              orientation="h", title="Pacotes por Dispositivo (Top 10 de cada cenário)",
+                              labels={'Source': 'Device IP', 'Count': 'Number of Packets'}),
+            ),
+            dcc.Graph(figure=length_distribution),
+            dcc.Graph(figure=inter_arrival_time_distribution),
+            html.H4("Diferença nas contagens por protocolo"),
+            difference_table,
+        ]),
+    ]
+
+
+# Callbacks do painel de depuração, registrados apenas com ele ativo. Não são
+# instrumentados, para não se misturarem às medidas das abas
+if config.DEBUG_PANEL:
+    @app.callback(Output('debug-content', 'children'),
+                  Input('debug-interval', 'n_intervals'))
+    def update_debug_panel(n_intervals):
+        header = ['Callback', 'Chamadas', 'Média (ms)', 'Última (ms)', 'Etapas da última (ms)', 'Resposta (kB)']
+        rows = []
+        for callback, totals in sorted(callback_metrics.callbacks().items()):
+            calls = totals.stages['callback']
+            stages = ', '.join(f"{stage}: {seconds * 1000:,.1f}" for stage, seconds in totals.last_stages.items()
+                               if stage != 'callback')
+            rows.append(html.Tr([
+                html.Td(callback),
+                html.Td(f"{calls.count:,}"),
+                html.Td(f"{calls.sum / calls.count * 1000:,.1f}"),
+                html.Td(f"{totals.last_stages['callback'] * 1000:,.1f}"),
+                html.Td(stages),
+                html.Td('' if totals.last_payload is None else f"{totals.last_payload / 1024:,.1f}"),
+            ]))
+        return html.Table([html.Tr([html.Th(column) for column in header])] + rows, style={'width': '100%'})
+
+    @app.callback(Output('profile-status', 'children'),
+                  Input('profile-button', 'n_clicks'),
+                  State('profile-callback', 'value'),
+                  prevent_initial_call=True)
+    def request_profile(n_clicks, callback):
+        if not callback:
+            raise PreventUpdate
+        callback_metrics.request_profile(callback)
+        return f"A próxima chamada de {callback} será gravada em {callback_metrics.profile_dir}."
 
 
 # Rodar o app
@@ -0,0 +1,180 @@
+import os
+import sys
+import threading
+from collections import OrderedDict
+
+import analysis
+import config
+import ingest
+import lazy
+import metrics
+import throughput
+from store import DatasetStore
+
+np = lazy.module('numpy')
+pd = lazy.module('pandas')
+
+
+def memory_size(value):
+    # Bytes ocupados por um resultado derivado: arrays e frames, somados
+    # através dos objetos, tuplas, listas e dicionários que os contêm
+    seen = set()
+
+    def size(item):
+        if id(item) in seen:
+            return 0
+        seen.add(id(item))
+        if isinstance(item, np.ndarray):
+            return item.nbytes
+        if isinstance(item, pd.DataFrame):
+            return int(item.memory_usage(deep=True).sum())
+        if isinstance(item, (pd.Series, pd.Index)):
+            return int(item.memory_usage(deep=True))
+        if isinstance(item, dict):
+            return sum(size(value) for value in item.values())
+        if isinstance(item, (list, tuple)):
+            return sum(size(value) for value in item)
+        if hasattr(item, '__dict__'):
+            return size(vars(item))
+        return sys.getsizeof(item)
+    return size(value)
+
+
+class Dataset:
+    # Frame de uma captura e os resultados derivados dele. derived traz
+    # resultados já calculados fora do frame (ex.: durante a leitura)
+    def __init__(self, digest, df, aggregates=None, store=None, derived=None):
+        self.digest = digest
+        self.df = df
+        self.store = store
+        self.aggregates = aggregates if aggregates is not None else analysis.compute_aggregates(df)
+        self._derived = dict(derived or {})
+        # Frame e resultados derivados guardados
+        self.memory_usage = (int(df.memory_usage(deep=True).sum())
+                             + sum(memory_size(value) for value in self._derived.values()))
+        # Chamado quando memory_usage cresce (o registro confere o limite)
+        self.on_resize = None
+        self._lock = threading.Lock()
+
+    def derived(self, name, compute, persist=False):
+        # Calcula uma única vez e reaproveita até o upload mudar. Com persist,
+        # o resultado também fica no armazenamento em disco
+        with self._lock:
+            if name in self._derived:
+                return self._derived[name]
+            value = None
+            if persist and self.store is not None:
+                value = self.store.load_derived(self.digest, name)
+            if value is None:
+                with metrics.stage(name):
+                    value = compute(self.df)
+                if persist and self.store is not None:
+                    self.store.save_derived(self.digest, name, value)
+            self._derived[name] = value
+            self.memory_usage += memory_size(value)
+        if self.on_resize is not None:
+            self.on_resize()
+        return value
+
+
+class DatasetRegistry:
+    # Capturas abertas, indexadas pelo digest do conteúdo. Ficam em memória
+    # até o limite configurado; as demais são reabertas do armazenamento
+    # colunar em disco
+    def __init__(self, store=None, memory_budget=config.MEMORY_BUDGET_MB * 2 ** 20):
+        self.store = store if store is not None else DatasetStore()
+        self.memory_budget = memory_budget
+        self._datasets = OrderedDict()
+        self._ingest_locks = {}
+        self._lock = threading.Lock()
+
+    def load(self, contents, name=None, session=None, progress=None):
+        with metrics.stage('spool'):
+            path, digest = ingest.spool_upload(contents)
+        try:
+            # Uploads simultâneos do mesmo arquivo são lidos uma única vez
+            with self._ingest_lock(digest):
+                dataset = self.get(digest)
+                if dataset is None:
+                    # Agregados calculados bloco a bloco, durante a leitura
+                    running = analysis.RunningAggregates()
+                    with metrics.stage('parse'):
+                        df = ingest.read_capture(path, progress, running)
+                    totals = running.throughput.throughput()
+                    dataset = Dataset(digest, df, running.aggregates(), self.store,
+                                      {throughput.DERIVED_NAME: totals})
+                    with metrics.stage('store'):
+                        self.store.save(digest, name, dataset.df, dataset.aggregates)
+                        self.store.save_derived(digest, throughput.DERIVED_NAME, totals)
+                    self._remember(dataset)
+        finally:
+            os.remove(path)
+
+        if session is not None:
+            self.store.add_to_session(session, digest, name)
+        return dataset
+
+    def get(self, digest):
+        if digest is None:
+            return None
+
+        with self._lock:
+            dataset = self._datasets.get(digest)
+            if dataset is not None:
+                self._datasets.move_to_end(digest)
+                return dataset
+
+        with metrics.stage('load'):
+            stored = self.store.load(digest)
+            if stored is None:
+                return None
+            df, aggregates = stored
+            dataset = Dataset(digest, df, aggregates, self.store)
+            if aggregates is None:
+                self.store.save_aggregates(digest, dataset.aggregates)
+            return self._remember(dataset)
+
+    # Agregados de uma captura: os da captura aberta ou, sem abri-la, os
+    # gravados no armazenamento
+    def aggregates(self, digest):
+        if digest is None:
+            return None
+        with self._lock:
+            dataset = self._datasets.get(digest)
+        if dataset is not None:
+            return dataset.aggregates
+        with metrics.stage('load'):
+            aggregates = self.store.load_aggregates(digest)
+        if aggregates is None and self.store.contains(digest):
+            # Gravados com outra versão: recalculados ao abrir a captura
+            dataset = self.get(digest)
+            return None if dataset is None else dataset.aggregates
+        return aggregates
+
+    # Cenários disponíveis, na ordem em que foram carregados. Com uma sessão,
+    # apenas os cenários carregados por ela
+    def scenarios(self, session=None):
+        if session is None:
+            return self.store.catalog()
+        return self.store.session_catalog(session)
+
+    def _ingest_lock(self, digest):
+        with self._lock:
+            return self._ingest_locks.setdefault(digest, threading.Lock())
+
+    def _remember(self, dataset):
+        dataset.on_resize = self._trim
+        with self._lock:
+            self._datasets[dataset.digest] = dataset
+            self._datasets.move_to_end(dataset.digest)
+        self._trim()
+        return dataset
+
+    def _trim(self):
+        # Descarta da memória as capturas usadas há mais tempo, mantendo ao
+        # menos a mais recente. Conta os frames e os resultados derivados
+        with self._lock:
+            used = sum(item.memory_usage for item in self._datasets.values())
+            while used > self.memory_budget and len(self._datasets) > 1:
+                digest, evicted = self._datasets.popitem(last=False)
+                used -= evicted.memory_usage
@@ -0,0 +1,146 @@
+import math
+
+import lazy
+import stats
+
+np = lazy.module('numpy')
+
+# Resolução do histograma guardado na ingestão
+KDE_BINS = 2 ** 14
+
+# Quantidade de pontos da curva enviada ao navegador
+CURVE_POINTS = 500
+
+# Intervalo coberto pelos bins de uma coluna constante, como fração do
+# valor (ou em unidades, se o valor é zero). A curva é desenhada como uma
+# gaussiana estreita em torno dele
+CONSTANT_SPAN = 0.02
+
+# Alcance do kernel, em larguras de banda
+KERNEL_RADIUS = 4
+
+
+class Histogram:
+    # Histograma de bins uniformes de uma coluna, com a contagem, a média e o
+    # desvio padrão exatos (stats.RunningStats) usados na escolha da largura
+    # de banda
+    def __init__(self, start, bin_width, counts, summary):
+        self.start = start
+        self.bin_width = bin_width
+        self.counts = counts
+        self.summary = summary
+
+    def update(self, values):
+        # Acrescenta valores de uma captura que ainda está crescendo. Quando
+        # eles caem fora do intervalo coberto, a largura dos bins dobra até
+        # cobri-los, mantendo a quantidade de bins
+        values = stats.finite(values)
+        if len(values) == 0:
+            return
+        if self.summary.count == 0:
+            self.__dict__.update(histogram(values, len(self.counts) or KDE_BINS).__dict__)
+            return
+
+        bins = len(self.counts)
+        low, high = float(values.min()), float(values.max())
+        # O último bin inclui o limite superior, como em histogram()
+        while low < self.start or high > self.start + bins * self.bin_width:
+            self._widen(low)
+
+        self.counts = self.counts + np.bincount(self.index(values), minlength=bins)
+        self.summary.update(values)
+
+    def index(self, values):
+        # Bin de cada valor; -1 para NaN e infinitos
+        values = np.asarray(values, dtype=np.float64)
+        valid = np.isfinite(values)
+        index = ((np.where(valid, values, self.start) - self.start) / self.bin_width).astype(np.int64)
+        np.clip(index, 0, len(self.counts) - 1, out=index)
+        index[~valid] = -1
+        return index
+
+    def _widen(self, low):
+        # Junta os bins dois a dois. O início recua o mínimo necessário para
+        # cobrir low, em bins inteiros, e no máximo o intervalo atual inteiro
+        bins = len(self.counts)
+        shift = min(max(math.ceil((self.start - low) / self.bin_width), 0), bins)
+        self.counts = np.bincount((np.arange(bins) + shift) // 2, weights=self.counts,
+                                  minlength=bins).astype(np.int64)
+        self.start -= shift * self.bin_width
+        self.bin_width *= 2
+
+
+def histogram(values, bins=KDE_BINS):
+    values = stats.finite(values)
+    summary = stats.RunningStats()
+    summary.update(values)
+
+    if len(values) == 0:
+        return Histogram(0.0, 1.0, np.zeros(0, dtype=np.int64), summary)
+
+    low, high = values.min(), values.max()
+    if high > low:
+        bin_width = (high - low) / bins
+    else:
+        # Coluna constante (por exemplo, tráfego cíclico de CLPs com quadros
+        # de 60 bytes): bins estreitos centrados no valor
+        bin_width = CONSTANT_SPAN * (abs(low) or 1.0) / bins
+        low -= bins / 2 * bin_width
+
+    index = ((values - low) / bin_width).astype(np.int64)
+    np.minimum(index, bins - 1, out=index)
+    counts = np.bincount(index, minlength=bins)
+    return Histogram(float(low), float(bin_width), counts, summary)
+
+
+def quantiles(hist, probabilities):
+    # Quantis aproximados pelo histograma, com interpolação linear dentro do
+    # bin: o erro é de no máximo a largura de um bin
+    if hist.summary.count == 0:
+        return [math.nan] * len(probabilities)
+    cumulative = np.cumsum(hist.counts)
+    targets = np.asarray(probabilities) * cumulative[-1]
+    index = np.minimum(np.searchsorted(cumulative, targets), len(cumulative) - 1)
+    before = cumulative[index] - hist.counts[index]
+    fraction = (targets - before) / np.maximum(hist.counts[index], 1)
+    values = hist.start + (index + fraction) * hist.bin_width
+    return np.clip(values, hist.summary.min, hist.summary.max)
+
+
+# Largura de banda pela regra de Scott, a mesma do scipy.stats.gaussian_kde
+def scott_bandwidth(hist):
+    return hist.summary.std * hist.summary.count ** (-1 / 5)
+
+
+def kde_curve(hist, points=CURVE_POINTS):
+    # Estimativa de densidade por kernel gaussiano calculada sobre o
+    # histograma: a convolução via FFT custa O(bins log bins),
+    # independente do número de pacotes
+    if hist.summary.count == 0:
+        return np.zeros(0), np.zeros(0)
+
+    counts = hist.counts.astype(np.float64)
+    bins = len(counts)
+    centers = hist.start + (np.arange(bins) + 0.5) * hist.bin_width
+    low, high = hist.summary.min, hist.summary.max
+
+    # Como no create_distplot, a curva vai do menor ao maior valor visto,
+    # mesmo que os bins cubram mais que isso após crescerem. Uma coluna
+    # constante é desenhada como uma gaussiana estreita em torno do valor;
+    # nas demais, o kernel cobre pelo menos um bin
+    if high == low:
+        bandwidth = CONSTANT_SPAN * (abs(low) or 1.0) / (2 * KERNEL_RADIUS)
+        low, high = low - KERNEL_RADIUS * bandwidth, high + KERNEL_RADIUS * bandwidth
+    else:
+        bandwidth = max(scott_bandwidth(hist), hist.bin_width)
+    sigma = bandwidth / hist.bin_width
+    x = np.linspace(low, high, points)
+
+    radius = min(int(math.ceil(KERNEL_RADIUS * sigma)), bins)
+    offsets = np.arange(-radius, radius + 1)
+    kernel = np.exp(-0.5 * (offsets / sigma) ** 2) / (math.sqrt(2 * math.pi) * sigma)
+
+    size = 1 << (bins + len(kernel) - 1).bit_length()
+    smoothed = np.fft.irfft(np.fft.rfft(counts, size) * np.fft.rfft(kernel, size), size)
+    density = np.maximum(smoothed[radius:radius + bins], 0) / (hist.summary.count * hist.bin_width)
+    return x, np.interp(x, centers, density)
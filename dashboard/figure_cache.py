@@ -0,0 +1,43 @@
+# Conteúdo das abas já serializado em JSON, por captura, aba e parâmetros da
+# vista (janela de tempo, métrica, zoom, cenários). Fica em disco, com
+# descarte dos menos usados, e é compartilhado entre os workers: revisitar
+# uma vista não monta nem serializa as figuras de novo
+import json
+
+import diskcache
+
+import config
+import lazy
+import live
+import metrics
+
+plotly_json = lazy.module('plotly.io.json')
+
+# Incrementar quando o conteúdo das abas mudar, para ignorar o que foi
+# guardado pelas versões anteriores
+CACHE_VERSION = 5
+
+
+class FigureCache:
+    def __init__(self, directory=config.FIGURE_CACHE_DIR, size_limit=config.FIGURE_CACHE_MB * 2 ** 20):
+        self.cache = diskcache.Cache(directory, size_limit=size_limit,
+                                     eviction_policy='least-recently-used')
+
+    def view(self, digest, tab, params, build):
+        # digest: da captura, ou tupla com os de várias capturas (comparação).
+        # As capturas ao vivo mudam a cada leitura e não são guardadas
+        digests = digest if isinstance(digest, tuple) else (digest,)
+        if any(live.is_live(value) for value in digests):
+            return build()
+
+        key = (CACHE_VERSION, digest, tab, params)
+        with metrics.stage('cache'):
+            data = self.cache.get(key)
+        if data is None:
+            output = build()
+            with metrics.stage('cache'):
+                data = plotly_json.to_json_plotly(output)
+                self.cache.set(key, data)
+            return output
+        # O Dash aceita as figuras e os componentes no formato JSON
+        return json.loads(data)
@@ -0,0 +1,65 @@
+# Traços de gráficos com muitos pontos. Acima de MAX_POINTS, os pontos são
+# reduzidos no servidor (LTTB para linhas, mínimo/máximo para marcadores),
+# e acima de WEBGL_POINTS o traço é desenhado com WebGL. Assim o JSON
+# enviado ao navegador fica limitado, qualquer que seja o tamanho da captura
+import plotly.graph_objects as go
+
+import lazy
+
+np = lazy.module('numpy')
+
+# Pontos máximos por traço: cerca de 400 kB de JSON
+MAX_POINTS = 10000
+
+# A partir daqui, Scattergl em vez de Scatter (SVG)
+WEBGL_POINTS = 1000
+
+
+def minmax_downsample(x, y, max_points=MAX_POINTS):
+    # Divide os pontos em max_points / 2 grupos consecutivos e mantém o menor
+    # e o maior y de cada um, preservando picos e vales
+    x, y = np.asarray(x), np.asarray(y)
+    if len(x) <= max_points:
+        return x, y
+    size = -(-len(y) // max(max_points // 2, 1))
+    groups = -(-len(y) // size)
+    padded = np.full(groups * size, np.nan)
+    padded[:len(y)] = y
+    padded = padded.reshape(groups, size)
+    offsets = np.arange(groups) * size
+    keep = np.unique(np.concatenate([offsets + np.nanargmin(padded, axis=1),
+                                     offsets + np.nanargmax(padded, axis=1)]))
+    return x[keep], y[keep]
+
+
+def lttb(x, y, max_points=MAX_POINTS):
+    # Largest-Triangle-Three-Buckets (Steinarsson, 2013): em cada grupo, fica
+    # o ponto que forma o maior triângulo com o ponto escolhido no grupo
+    # anterior e a média do grupo seguinte
+    x, y = np.asarray(x), np.asarray(y)
+    n = len(x)
+    if n <= max_points or max_points < 3:
+        return x, y
+    xf, yf = x.astype(np.float64), y.astype(np.float64)
+    edges = np.linspace(1, n - 1, max_points - 1).astype(np.int64)
+    keep = np.empty(max_points, dtype=np.int64)
+    keep[0], keep[-1] = 0, n - 1
+    a = 0
+    for i in range(max_points - 2):
+        start, end = edges[i], edges[i + 1]
+        if i + 2 < len(edges):
+            next_x, next_y = xf[end:edges[i + 2]].mean(), yf[end:edges[i + 2]].mean()
+        else:
+            next_x, next_y = xf[-1], yf[-1]
+        area = np.abs((xf[a] - next_x) * (yf[start:end] - yf[a])
+                      - (xf[a] - xf[start:end]) * (next_y - yf[a]))
+        a = start + int(np.argmax(area))
+        keep[i + 1] = a
+    return x[keep], y[keep]
+
+
+def scatter(x, y, mode='markers', max_points=MAX_POINTS, **kwargs):
+    if len(x) > max_points:
+        x, y = (lttb if 'lines' in mode else minmax_downsample)(x, y, max_points)
+    trace = go.Scattergl if len(x) > WEBGL_POINTS else go.Scatter
+    return trace(x=x, y=y, mode=mode, **kwargs)
@@ -0,0 +1,65 @@
+# Conversas da captura: pacotes entre dois dispositivos com o mesmo
+# protocolo, nos dois sentidos. O agrupamento usa os códigos inteiros das
+# colunas categóricas, nunca os textos dos endereços
+import lazy
+
+np = lazy.module('numpy')
+pd = lazy.module('pandas')
+
+FLOW_COLUMNS = ['Endpoint A', 'Endpoint B', 'Protocol', 'Packets', 'Bytes', 'Start', 'Duration',
+                'Mean Inter-Arrival']
+
+
+# Conversas de uma captura não vazia, das que somam mais bytes para as que
+# somam menos
+def compute_flows(df):
+    # Source e Destination compartilham as categorias; o código -1 (sem
+    # endereço) vira 0 e os demais são deslocados de 1
+    endpoints = df["Source"].cat.categories
+    protocols = df["Protocol"].cat.categories
+    source = df["Source"].cat.codes.to_numpy().astype(np.int64) + 1
+    destination = df["Destination"].cat.codes.to_numpy().astype(np.int64) + 1
+    protocol = df["Protocol"].cat.codes.to_numpy().astype(np.int64) + 1
+
+    # A conversa não depende do sentido: o menor código fica em A
+    low = np.minimum(source, destination)
+    high = np.maximum(source, destination)
+    endpoint_base = len(endpoints) + 1
+    protocol_base = len(protocols) + 1
+    key = (low * endpoint_base + high) * protocol_base + protocol
+
+    # Ordena pelas chaves e soma cada trecho de chave igual
+    order = np.argsort(key)
+    key = key[order]
+    heads = np.flatnonzero(np.diff(key, prepend=-1))
+    times = df["Time"].to_numpy(dtype=np.float64)[order]
+    packets = np.diff(np.append(heads, len(key)))
+    total_bytes = np.add.reduceat(df["Length"].to_numpy().astype(np.int64)[order], heads)
+    start = np.minimum.reduceat(times, heads)
+    end = np.maximum.reduceat(times, heads)
+
+    # Conversas com mais bytes primeiro
+    order = np.argsort(-total_bytes)
+    key, packets, total_bytes, start, end = key[heads][order], packets[order], total_bytes[order], start[order], end[order]
+    protocol = key % protocol_base
+    high = key // protocol_base % endpoint_base
+    low = key // protocol_base // endpoint_base
+
+    duration = end - start
+    return pd.DataFrame({
+        'Endpoint A': pd.Categorical.from_codes(low - 1, endpoints),
+        'Endpoint B': pd.Categorical.from_codes(high - 1, endpoints),
+        'Protocol': pd.Categorical.from_codes(protocol - 1, protocols),
+        'Packets': packets,
+        'Bytes': total_bytes,
+        'Start': start,
+        'Duration': duration,
+        # A média dos intervalos entre pacotes consecutivos de um fluxo é a
+        # duração dividida pelo número de intervalos
+        'Mean Inter-Arrival': np.divide(duration, packets - 1, out=np.full(len(packets), np.nan),
+                                        where=packets > 1),
+    })
+
+
+def flow_table(dataset):
+    return dataset.derived('flows', compute_flows)
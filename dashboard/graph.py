@@ -0,0 +1,98 @@
+# Grafo de comunicação entre dispositivos: quem troca pacotes com quem. O
+# layout é calculado uma única vez por captura e guardado junto dela
+import lazy
+
+np = lazy.module('numpy')
+
+# Dispositivos desenhados: os de maior grau. Os demais são podados para que
+# o grafo continue interativo no navegador
+MAX_NODES = 2000
+
+# Ligações desenhadas entre os dispositivos mantidos, as de mais pacotes
+MAX_EDGES = 20000
+
+# Iterações do layout por forças (Fruchterman-Reingold)
+LAYOUT_ITERATIONS = 50
+
+
+class Graph:
+    # Dispositivos mantidos, com grau e posição, e as ligações entre eles.
+    # node_count e edge_count são os totais antes da poda
+    def __init__(self, names, degree, positions, sources, targets, packets, node_count, edge_count):
+        self.names = names
+        self.degree = degree
+        self.positions = positions
+        self.sources = sources
+        self.targets = targets
+        self.packets = packets
+        self.node_count = node_count
+        self.edge_count = edge_count
+
+
+def force_layout(node_count, sources, targets, iterations=LAYOUT_ITERATIONS, seed=0):
+    # Repulsão entre todos os pares e atração ao longo das ligações, com a
+    # temperatura caindo linearmente. A repulsão usa produtos de matrizes,
+    # sem montar as diferenças de todos os pares
+    rng = np.random.default_rng(seed)
+    positions = rng.uniform(-1, 1, (node_count, 2)).astype(np.float32)
+    if node_count < 2:
+        return positions
+    k = np.float32(np.sqrt(4 / node_count))
+    temperature = 0.2
+
+    for i in range(iterations):
+        squared = (positions ** 2).sum(axis=1)
+        distance2 = squared[:, None] + squared[None, :] - 2 * (positions @ positions.T)
+        weights = k * k / np.maximum(distance2, np.float32(1e-4))
+        np.fill_diagonal(weights, 0)
+        displacement = positions * weights.sum(axis=1)[:, None] - weights @ positions
+
+        edge = positions[sources] - positions[targets]
+        force = edge * (np.sqrt((edge ** 2).sum(axis=1)) / k)[:, None]
+        for axis in range(2):
+            displacement[:, axis] -= np.bincount(sources, weights=force[:, axis], minlength=node_count)
+            displacement[:, axis] += np.bincount(targets, weights=force[:, axis], minlength=node_count)
+
+        length = np.maximum(np.sqrt((displacement ** 2).sum(axis=1)), np.float32(1e-9))
+        step = temperature * (1 - i / iterations)
+        positions += displacement * (np.minimum(length, step) / length)[:, None]
+    return positions
+
+
+def compute_graph(df):
+    # Ligações sem sentido entre códigos de dispositivos (Source e Destination
+    # compartilham as categorias), ignorando pacotes sem endereço
+    names = df["Source"].cat.categories
+    source = df["Source"].cat.codes.to_numpy().astype(np.int64)
+    destination = df["Destination"].cat.codes.to_numpy().astype(np.int64)
+    valid = (source >= 0) & (destination >= 0) & (source != destination)
+    low = np.minimum(source[valid], destination[valid])
+    high = np.maximum(source[valid], destination[valid])
+    keys, packets = np.unique(low * len(names) + high, return_counts=True)
+    low, high = keys // len(names), keys % len(names)
+
+    degree = np.bincount(low, minlength=len(names)) + np.bincount(high, minlength=len(names))
+    present = np.flatnonzero(degree)
+
+    # Poda por grau: mantém os dispositivos mais conectados
+    kept = present[np.argsort(-degree[present], kind='stable')[:MAX_NODES]]
+    index = np.full(len(names), -1)
+    index[kept] = np.arange(len(kept))
+    edges = np.flatnonzero((index[low] >= 0) & (index[high] >= 0))
+    edges = edges[np.argsort(-packets[edges], kind='stable')[:MAX_EDGES]]
+    sources, targets = index[low[edges]], index[high[edges]]
+
+    return Graph(
+        names=np.asarray(names[kept], dtype=object),
+        degree=degree[kept],
+        positions=force_layout(len(kept), sources, targets),
+        sources=sources,
+        targets=targets,
+        packets=packets[edges],
+        node_count=len(present),
+        edge_count=len(keys),
+    )
+
+
+def communication_graph(dataset):
+    return dataset.derived('graph', compute_graph, persist=True)
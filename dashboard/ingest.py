@@ -0,0 +1,126 @@
+import base64
+import hashlib
+import os
+import tempfile
+import time
+
+import config
+import lazy
+
+np = lazy.module('numpy')
+pd = lazy.module('pandas')
+pcap = lazy.module('pcap')
+
+# Tamanho, em caracteres base64, de cada bloco decodificado do upload
+UPLOAD_CHUNK_CHARS = 4 * 2 ** 20
+
+# Linhas lidas por vez do CSV exportado do Wireshark
+CSV_CHUNK_ROWS = 1_000_000
+
+
+# Tipos das colunas do CSV exportado do Wireshark. Colunas de texto com
+# poucos valores distintos viram categóricas
+PACKET_SCHEMA = {
+    'No.': 'uint32',
+    'Time': 'float64',
+    'Source': 'category',
+    'Destination': 'category',
+    'Protocol': 'category',
+    'Length': 'uint32',
+    'Info': 'object',
+}
+
+# Colunas que compartilham as mesmas categorias, para que os códigos inteiros
+# identifiquem o mesmo dispositivo nas duas
+ENDPOINT_COLUMNS = ['Source', 'Destination']
+
+
+# Decodifica o conteúdo enviado pelo dcc.Upload em blocos, gravando o
+# arquivo em disco e calculando o digest sem manter cópias inteiras em memória
+def spool_upload(contents, directory=None):
+    start = contents.index(',') + 1
+    digest = hashlib.sha256()
+
+    with tempfile.NamedTemporaryFile('wb', dir=directory, delete=False) as spool:
+        for offset in range(start, len(contents), UPLOAD_CHUNK_CHARS):
+            data = base64.b64decode(contents[offset:offset + UPLOAD_CHUNK_CHARS])
+            digest.update(data)
+            spool.write(data)
+
+    return spool.name, digest.hexdigest()
+
+
+def iter_capture_chunks(source, chunksize=CSV_CHUNK_ROWS, drop_info=None):
+    if drop_info is None:
+        drop_info = config.DROP_INFO
+    usecols = (lambda column: column != 'Info') if drop_info else None
+
+    with pd.read_csv(source, chunksize=chunksize, dtype=PACKET_SCHEMA, usecols=usecols) as reader:
+        yield from reader
+
+
+# Junta os blocos lidos, unindo as categorias de cada um
+def concat_chunks(chunks):
+    if len(chunks) == 1:
+        df = chunks[0].reset_index(drop=True)
+    else:
+        categorical = [column for column in chunks[0].columns
+                       if isinstance(chunks[0][column].dtype, pd.CategoricalDtype)]
+        columns = {}
+        for column in chunks[0].columns:
+            if column in categorical:
+                columns[column] = pd.Series(pd.api.types.union_categoricals([chunk[column] for chunk in chunks]))
+            else:
+                columns[column] = pd.Series(np.concatenate([chunk[column].to_numpy() for chunk in chunks]))
+            # Libera os blocos à medida que cada coluna é montada
+            for chunk in chunks:
+                del chunk[column]
+        df = pd.DataFrame(columns)
+    return apply_schema(df)
+
+
+def apply_schema(df):
+    endpoints = [column for column in ENDPOINT_COLUMNS
+                 if column in df.columns and isinstance(df[column].dtype, pd.CategoricalDtype)]
+    if endpoints:
+        categories = pd.api.types.union_categoricals([df[column] for column in endpoints], sort_categories=True).categories
+        for column in endpoints:
+            df[column] = df[column].cat.set_categories(categories)
+    for column in df.columns:
+        if isinstance(df[column].dtype, pd.CategoricalDtype) and column not in endpoints:
+            df[column] = df[column].cat.reorder_categories(sorted(df[column].cat.categories))
+
+    # Comprimentos acima de 65535 só aparecem com offload de segmentação
+    if 'Length' in df.columns and len(df) and df['Length'].max() <= np.iinfo(np.uint16).max:
+        df['Length'] = df['Length'].astype('uint16')
+    return df
+
+
+# Lê o CSV exportado do Wireshark ou o arquivo pcap/pcapng original. Se
+# informado, progress é chamado a cada bloco com as linhas lidas, a fração
+# do arquivo lida e as linhas por segundo, e aggregates (RunningAggregates)
+# é atualizado com cada bloco
+def read_capture(path, progress=None, aggregates=None):
+    if pcap.is_capture_file(path):
+        df = apply_schema(pcap.read_pcap(path, progress))
+        if aggregates is not None:
+            aggregates.update(df)
+        return df
+
+    total_bytes = os.path.getsize(path)
+    started = time.perf_counter()
+    chunks = []
+    rows = 0
+
+    with open(path, 'rb') as f:
+        for chunk in iter_capture_chunks(f):
+            chunks.append(chunk)
+            rows += len(chunk)
+            if aggregates is not None:
+                aggregates.update(chunk)
+            if progress is not None:
+                elapsed = time.perf_counter() - started
+                progress(rows, f.tell() / total_bytes if total_bytes else 1.0,
+                         rows / elapsed if elapsed else 0.0)
+
+    return concat_chunks(chunks)
@@ -0,0 +1,25 @@
+# Módulos pesados (numpy, pandas, pyarrow, plotly.express) importados apenas
+# no primeiro uso. O servidor sobe sem carregá-los, e o custo fica para o
+# primeiro callback que precisa deles
+import importlib
+
+
+class LazyModule:
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attr):
+        # import_module é seguro entre threads: requisições simultâneas
+        # esperam a mesma importação, sem ver o módulo pela metade
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return getattr(self._module, attr)
+
+    def __repr__(self):
+        state = 'carregado' if self._module is not None else 'não carregado'
+        return f'<módulo {self._name} ({state})>'
+
+
+def module(name):
+    return LazyModule(name)
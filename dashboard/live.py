@@ -0,0 +1,153 @@
+# Capturas ao vivo: arquivos que ainda estão sendo gravados pelo tshark,
+# tcpdump ou pela exportação do Wireshark. Cada leitura decodifica apenas
+# os pacotes acrescentados desde a anterior
+import io
+import os
+import threading
+
+import analysis
+import config
+import ingest
+import lazy
+import throughput
+from datasets import Dataset
+
+pd = lazy.module('pandas')
+pcap = lazy.module('pcap')
+
+# Prefixo dos valores do menu de cenários que apontam para capturas ao vivo
+LIVE_PREFIX = 'live:'
+
+# Intervalo, em milissegundos, entre as leituras feitas pelo navegador
+POLL_INTERVAL_MS = 2000
+
+
+def is_live(value):
+    return isinstance(value, str) and value.startswith(LIVE_PREFIX)
+
+
+class CsvTail:
+    # Lê as linhas completas acrescentadas ao CSV, reaproveitando o cabeçalho
+    def __init__(self, path):
+        self.path = path
+        self.position = 0
+        self.header = None
+
+    def read(self):
+        with open(self.path, 'rb') as f:
+            f.seek(self.position)
+            data = f.read()
+
+        # A última linha pode estar pela metade; fica para a próxima leitura
+        data = data[:data.rfind(b'\n') + 1]
+        if not data:
+            return []
+        self.position += len(data)
+
+        if self.header is None:
+            newline = data.index(b'\n') + 1
+            self.header, data = data[:newline], data[newline:]
+            if not data:
+                return []
+        return list(ingest.iter_capture_chunks(io.BytesIO(self.header + data)))
+
+
+class PcapTail:
+    # Lê os pacotes completos acrescentados ao pcap ou pcapng
+    def __init__(self, path):
+        self.path = path
+        self.tail = pcap.Tail()
+
+    @property
+    def position(self):
+        return self.tail.position
+
+    def read(self):
+        size = os.path.getsize(self.path)
+        if size < 24 or size == self.tail.position:
+            return []
+        df = pcap.read_pcap(self.path, tail=self.tail)
+        return [df] if len(df) else []
+
+
+class LiveCapture:
+    # Captura ao vivo. Os agregados cobrem todos os pacotes lidos; a tabela
+    # de detalhes mostra apenas os mais recentes
+    def __init__(self, path, window=config.LIVE_WINDOW_ROWS):
+        self.path = path
+        self.name = os.path.basename(path)
+        self.window = window
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self._reader = None
+        self._running = analysis.RunningAggregates()
+        self._recent = []
+        self._recent_rows = 0
+        self._snapshot = None
+
+    def poll(self):
+        # Lê os pacotes novos e devolve um Dataset com o estado atual
+        with self._lock:
+            size = os.path.getsize(self.path)
+            # Arquivo recriado desde a última leitura: recomeça do início
+            if self._reader is not None and size < self._reader.position:
+                self._reset()
+            if self._reader is None and size >= 4:
+                self._reader = PcapTail(self.path) if pcap.is_capture_file(self.path) else CsvTail(self.path)
+
+            chunks = self._reader.read() if self._reader is not None else []
+            for chunk in chunks:
+                self._running.update(chunk)
+                self._recent.append(chunk)
+                self._recent_rows += len(chunk)
+            while len(self._recent) > 1 and self._recent_rows - len(self._recent[0]) >= self.window:
+                self._recent_rows -= len(self._recent.pop(0))
+
+            if chunks or self._snapshot is None:
+                self._snapshot = self._build_snapshot()
+            return self._snapshot
+
+    def _build_snapshot(self):
+        if self._recent:
+            # concat_chunks consome as colunas dos blocos; passa cópias rasas
+            df = ingest.concat_chunks([chunk.copy(deep=False) for chunk in self._recent])
+            if len(df) > self.window:
+                df = df.iloc[-self.window:].reset_index(drop=True)
+        else:
+            df = ingest.apply_schema(pd.DataFrame({column: pd.Series(dtype=dtype)
+                                                   for column, dtype in ingest.PACKET_SCHEMA.items()}))
+        aggregates = self._running.aggregates()
+        # A vazão cobre todos os pacotes lidos, não apenas os recentes
+        return Dataset(f"{LIVE_PREFIX}{self.name}:{aggregates.packet_count}", df, aggregates,
+                       derived={throughput.DERIVED_NAME: self._running.throughput.throughput()})
+
+
+class LiveSources:
+    # Capturas ao vivo do diretório configurado, abertas na primeira consulta.
+    # Cada processo do servidor acompanha os arquivos por conta própria
+    def __init__(self, directory=config.LIVE_DIR):
+        self.directory = directory
+        self._captures = {}
+        self._lock = threading.Lock()
+
+    def names(self):
+        if not self.directory or not os.path.isdir(self.directory):
+            return []
+        return sorted(name for name in os.listdir(self.directory)
+                      if os.path.isfile(os.path.join(self.directory, name)))
+
+    def options(self):
+        return [{'label': f"Ao vivo: {name}", 'value': LIVE_PREFIX + name} for name in self.names()]
+
+    def poll(self, value):
+        # Só aceita nomes listados no diretório, nunca caminhos arbitrários
+        name = value[len(LIVE_PREFIX):]
+        if name not in self.names():
+            return None
+        with self._lock:
+            capture = self._captures.get(name)
+            if capture is None:
+                capture = self._captures[name] = LiveCapture(os.path.join(self.directory, name))
+        return capture.poll()
@@ -0,0 +1,193 @@
+# Tempos por etapa e tamanho das respostas de cada callback. Os totais ficam
+# em um cache em disco, para somar as chamadas de todos os workers e dos
+# processos da ingestão em segundo plano, e são expostos em /metrics no
+# formato texto do Prometheus
+import contextlib
+import contextvars
+import cProfile
+import functools
+import os
+import time
+
+import diskcache
+import flask
+
+import config
+
+# Limites dos baldes dos histogramas, em segundos e em bytes
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+BYTES_BUCKETS = (1e3, 1e4, 1e5, 3e5, 1e6, 3e6, 1e7, 3e7)
+
+# Etapas da chamada em andamento: nome da etapa -> segundos
+_timings = contextvars.ContextVar('timings', default=None)
+
+
+class Histogram:
+    # Contagem, soma e baldes cumulativos, como os histogramas do Prometheus
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+        for i, limit in enumerate(self.buckets):
+            if value <= limit:
+                self.counts[i] += 1
+
+
+class CallbackMetrics:
+    # Totais de um callback e as etapas da última chamada, para o painel
+    def __init__(self):
+        self.stages = {}
+        self.payload = Histogram(BYTES_BUCKETS)
+        self.last_stages = {}
+        self.last_payload = None
+        self.last_time = None
+
+    def observe(self, timings, payload):
+        for stage, seconds in timings.items():
+            self.stages.setdefault(stage, Histogram(SECONDS_BUCKETS)).observe(seconds)
+        if payload is not None:
+            self.payload.observe(payload)
+        self.last_stages = dict(timings)
+        self.last_payload = payload
+        self.last_time = time.time()
+
+
+@contextlib.contextmanager
+def stage(name):
+    # Soma o tempo do bloco à etapa name da chamada em andamento. Fora de um
+    # callback instrumentado, não faz nada
+    timings = _timings.get()
+    if timings is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[name] = timings.get(name, 0.0) + time.perf_counter() - started
+
+
+class Metrics:
+    def __init__(self, directory=config.METRICS_DIR, profile_dir=config.PROFILE_DIR):
+        self.cache = diskcache.Cache(directory)
+        self.profile_dir = profile_dir
+        # Nomes dos callbacks instrumentados, para o pedido de perfil
+        self.instrumented = []
+
+    def record(self, callback, timings, payload=None):
+        # Uma leitura e uma gravação por chamada, na mesma transação
+        with self.cache.transact():
+            totals = self.cache.get(('callback', callback)) or CallbackMetrics()
+            totals.observe(timings, payload)
+            self.cache.set(('callback', callback), totals)
+
+    def callbacks(self):
+        totals = {key[1]: self.cache.get(key) for key in self.cache.iterkeys()
+                  if isinstance(key, tuple) and key[0] == 'callback'}
+        return {callback: values for callback, values in totals.items() if values is not None}
+
+    def instrument(self, func):
+        # Mede o callback inteiro ('callback') e as etapas marcadas com
+        # stage() dentro dele. Em uma requisição, o registro fica para o fim
+        # dela, quando o tamanho da resposta é conhecido (ver init_app); nos
+        # callbacks em segundo plano, é gravado ao terminar. Os processos em
+        # segundo plano nascem de um fork durante a requisição e herdam o
+        # contexto dela, por isso a comparação do pid
+        self.instrumented.append(func.__name__)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            timings = {}
+            token = _timings.set(timings)
+            profiler = self._profiler(func.__name__)
+            started = time.perf_counter()
+            try:
+                if profiler is None:
+                    return func(*args, **kwargs)
+                with profiler:
+                    return func(*args, **kwargs)
+            finally:
+                timings['callback'] = time.perf_counter() - started
+                _timings.reset(token)
+                if profiler is not None:
+                    self._save_profile(profiler, func.__name__)
+                if flask.has_request_context() and flask.g.get('metrics_pid') == os.getpid():
+                    flask.g.metrics_callback = func.__name__
+                    flask.g.metrics_timings = timings
+                    flask.g.metrics_finished = time.perf_counter()
+                else:
+                    self.record(func.__name__, timings)
+        return wrapper
+
+    def init_app(self, server):
+        @server.before_request
+        def mark_request():
+            flask.g.metrics_pid = os.getpid()
+
+        # Ao fim de cada requisição de callback, grava as etapas com a
+        # serialização da resposta e o tamanho dela
+        @server.after_request
+        def record_request(response):
+            callback = flask.g.pop('metrics_callback', None)
+            if callback is not None:
+                timings = flask.g.pop('metrics_timings')
+                timings['serialize'] = time.perf_counter() - flask.g.pop('metrics_finished')
+                self.record(callback, timings, response.calculate_content_length())
+            return response
+
+        @server.route('/metrics')
+        def prometheus_metrics():
+            return flask.Response(self.exposition(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+    # Perfil de uma única chamada: a próxima do callback indicado, em
+    # qualquer processo, roda sob o profiler configurado
+    def request_profile(self, callback):
+        self.cache.set(('profile', callback), True)
+
+    def _profiler(self, callback):
+        # pop é atômico: só um processo recebe o pedido
+        if ('profile', callback) not in self.cache or self.cache.pop(('profile', callback)) is None:
+            return None
+        if config.PROFILER == 'pyinstrument':
+            import pyinstrument
+            return pyinstrument.Profiler()
+        return cProfile.Profile()
+
+    def _save_profile(self, profiler, callback):
+        os.makedirs(self.profile_dir, exist_ok=True)
+        path = os.path.join(self.profile_dir, f"{callback}-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}")
+        if isinstance(profiler, cProfile.Profile):
+            # Abrir com python -m pstats ou snakeviz
+            profiler.dump_stats(f'{path}.prof')
+        else:
+            with open(f'{path}.html', 'w') as f:
+                f.write(profiler.output_html())
+
+    def exposition(self):
+        lines = []
+
+        def histogram(name, description, series):
+            lines.append(f'# HELP {name} {description}')
+            lines.append(f'# TYPE {name} histogram')
+            for labels, values in series:
+                label_text = ','.join(f'{key}="{value}"' for key, value in labels.items())
+                for limit, count in zip(values.buckets, values.counts):
+                    lines.append(f'{name}_bucket{{{label_text},le="{limit:g}"}} {count}')
+                lines.append(f'{name}_bucket{{{label_text},le="+Inf"}} {values.count}')
+                lines.append(f'{name}_sum{{{label_text}}} {values.sum!r}')
+                lines.append(f'{name}_count{{{label_text}}} {values.count}')
+
+        callbacks = sorted(self.callbacks().items())
+        histogram('analise_callback_stage_seconds',
+                  'Tempo de cada etapa dos callbacks do dashboard, em segundos.',
+                  [({'callback': callback, 'stage': stage}, values)
+                   for callback, totals in callbacks for stage, values in sorted(totals.stages.items())])
+        histogram('analise_callback_response_bytes',
+                  'Tamanho das respostas dos callbacks enviadas ao navegador, em bytes.',
+                  [({'callback': callback}, totals.payload) for callback, totals in callbacks if totals.payload.count])
+        return '\n'.join(lines) + '\n'
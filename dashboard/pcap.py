@@ -0,0 +1,468 @@
+import ipaddress
+import mmap
+import struct
+import time
+from array import array
+
+import numpy as np
+import pandas as pd
+
+# Leitura direta de arquivos pcap/pcapng, sem exportar CSV no Wireshark.
+# Gera as mesmas colunas No., Time, Source, Destination, Protocol e Length
+
+# Bytes iniciais de cada pacote copiados para decodificar os cabeçalhos
+SNAP_BYTES = 96
+
+# Pacotes decodificados por vez
+BATCH_PACKETS = 1_000_000
+
+# Magic do pcap clássico: (ordem dos bytes, frações de segundo por segundo)
+PCAP_MAGIC = {
+    b'\xd4\xc3\xb2\xa1': ('<', 10 ** 6),
+    b'\xa1\xb2\xc3\xd4': ('>', 10 ** 6),
+    b'\x4d\x3c\xb2\xa1': ('<', 10 ** 9),
+    b'\xa1\xb2\x3c\x4d': ('>', 10 ** 9),
+}
+PCAPNG_MAGIC = b'\x0a\x0d\x0d\x0a'
+
+LINKTYPE_ETHERNET = 1
+LINKTYPE_RAW = 101
+LINKTYPE_LINUX_SLL = 113
+LINKTYPE_IPV4 = 228
+LINKTYPE_IPV6 = 229
+LINKTYPE_LINUX_SLL2 = 276
+
+ETHERTYPE_IPV4 = 0x0800
+ETHERTYPE_ARP = 0x0806
+ETHERTYPE_IPV6 = 0x86DD
+ETHERTYPE_VLAN = (0x8100, 0x88A8)
+
+# Nomes de protocolo, no mesmo formato da coluna Protocol do Wireshark
+PROTOCOLS = [
+    'TCP', 'UDP', 'ICMP', 'ICMPv6', 'IGMP', 'IPv4', 'IPv6', 'ARP', 'LLC', 'STP',
+    'LLDP', 'PNIO', 'GOOSE', 'SV', 'ECAT', 'EAPOL', 'Modbus/TCP', 'S7COMM', 'ENIP',
+    'DNP 3.0', 'OpcUa', 'IEC 60870-5-104', 'BVLC', 'MQTT', 'DNS', 'HTTP', 'TLS',
+    'SSH', 'TELNET', 'FTP', 'SMTP', 'NTP', 'SNMP', 'DHCP', 'DHCPv6', 'TFTP', 'SSDP',
+    'MDNS', 'LLMNR', 'NBNS', 'BROWSER', 'Syslog', 'SIP', 'RDP', 'SMB', 'LDAP',
+]
+CODE = {name: code for code, name in enumerate(PROTOCOLS)}
+
+ETHERTYPES = {
+    0x88CC: 'LLDP', 0x8892: 'PNIO', 0x88B8: 'GOOSE', 0x88BA: 'SV', 0x88A4: 'ECAT',
+    0x888E: 'EAPOL', ETHERTYPE_ARP: 'ARP', ETHERTYPE_IPV4: 'IPv4', ETHERTYPE_IPV6: 'IPv6',
+}
+
+TCP_PORTS = {
+    502: 'Modbus/TCP', 102: 'S7COMM', 44818: 'ENIP', 20000: 'DNP 3.0', 4840: 'OpcUa',
+    2404: 'IEC 60870-5-104', 1883: 'MQTT', 53: 'DNS', 80: 'HTTP', 8080: 'HTTP',
+    443: 'TLS', 8443: 'TLS', 22: 'SSH', 23: 'TELNET', 21: 'FTP', 25: 'SMTP', 3389: 'RDP',
+    445: 'SMB', 139: 'SMB', 389: 'LDAP', 5060: 'SIP',
+}
+UDP_PORTS = {
+    2222: 'ENIP', 44818: 'ENIP', 20000: 'DNP 3.0', 47808: 'BVLC', 53: 'DNS', 123: 'NTP',
+    161: 'SNMP', 162: 'SNMP', 67: 'DHCP', 68: 'DHCP', 546: 'DHCPv6', 547: 'DHCPv6',
+    69: 'TFTP', 1900: 'SSDP', 5353: 'MDNS', 5355: 'LLMNR', 137: 'NBNS', 138: 'BROWSER',
+    514: 'Syslog', 5060: 'SIP',
+}
+IP_PROTOCOLS = {6: 'TCP', 17: 'UDP', 1: 'ICMP', 58: 'ICMPv6', 2: 'IGMP'}
+
+
+def _lookup_table(names):
+    table = np.full(65536, -1, dtype=np.int16)
+    for key, name in names.items():
+        table[key] = CODE[name]
+    return table
+
+
+TCP_TABLE = _lookup_table(TCP_PORTS)
+UDP_TABLE = _lookup_table(UDP_PORTS)
+ETHERTYPE_TABLE = _lookup_table(ETHERTYPES)
+IP_PROTOCOL_TABLE = np.full(256, -1, dtype=np.int16)
+for _number, _name in IP_PROTOCOLS.items():
+    IP_PROTOCOL_TABLE[_number] = CODE[_name]
+
+# Tipo do endereço no primeiro byte da chave de 17 bytes de cada endpoint
+ADDRESS_MAC, ADDRESS_IPV4, ADDRESS_IPV6 = 1, 4, 6
+ADDRESS_KEY = np.dtype((np.void, 17))
+
+
+def is_capture_file(path):
+    with open(path, 'rb') as f:
+        magic = f.read(4)
+    return magic in PCAP_MAGIC or magic == PCAPNG_MAGIC
+
+
+class Records:
+    # Posição e cabeçalho de cada pacote dentro do arquivo
+    def __init__(self, data_offsets, caplen, orig_len, seconds, fraction, ticks, linktypes):
+        self.data_offsets = data_offsets
+        self.caplen = caplen
+        self.orig_len = orig_len
+        self.seconds = seconds
+        self.fraction = fraction
+        self.ticks = ticks
+        self.linktypes = linktypes
+
+
+class Tail:
+    # Posição de leitura de uma captura que ainda está sendo gravada, para que
+    # cada leitura decodifique apenas os pacotes novos
+    def __init__(self):
+        self.position = 0
+        self.packets = 0
+        # Instante do primeiro pacote, origem da coluna Time
+        self.origin = None
+        # Estado do pcapng: ordem dos bytes, interfaces e início da seção atual
+        self.endian = '<'
+        self.descriptions = []
+        self.section = 0
+        self.timestamp = 0
+
+
+def _walk_pcap(buffer, raw, tail):
+    endian, ticks = PCAP_MAGIC[bytes(buffer[:4])]
+    linktype = struct.unpack_from(endian + 'I', buffer, 20)[0] & 0x0FFFFFFF
+
+    # Os registros têm tamanho variável, então só o encadeamento dos
+    # deslocamentos é sequencial; os cabeçalhos são lidos depois em bloco
+    offsets = array('q')
+    append = offsets.append
+    incl_len = struct.Struct(endian + 'I').unpack_from
+    position, last = max(tail.position, 24), len(buffer) - 16
+    while position <= last:
+        end = position + 16 + incl_len(buffer, position + 8)[0]
+        if end > last + 16:
+            break
+        append(position)
+        position = end
+    tail.position = position
+
+    offsets = np.frombuffer(offsets, dtype=np.int64)
+    header = np.dtype([('seconds', endian + 'u4'), ('fraction', endian + 'u4'),
+                       ('caplen', endian + 'u4'), ('orig_len', endian + 'u4')])
+    # Apenas os 16 bytes do cabeçalho de cada pacote são copiados
+    if len(offsets):
+        headers = np.lib.stride_tricks.sliding_window_view(raw, 16)[offsets].view(header).ravel()
+    else:
+        headers = np.zeros(0, dtype=header)
+
+    return Records(
+        data_offsets=offsets + 16,
+        caplen=headers['caplen'].astype(np.int64),
+        orig_len=headers['orig_len'].astype(np.int64),
+        seconds=headers['seconds'].astype(np.int64),
+        fraction=headers['fraction'].astype(np.int64),
+        ticks=np.full(len(offsets), ticks, dtype=np.int64),
+        linktypes=np.full(len(offsets), linktype, dtype=np.int32),
+    )
+
+
+def _interface_ticks(buffer, endian, start, end):
+    # Opção if_tsresol (código 9) do bloco de descrição da interface
+    position = start
+    while position + 4 <= end:
+        code, length = struct.unpack_from(endian + 'HH', buffer, position)
+        if code == 0:
+            break
+        if code == 9 and length >= 1:
+            value = buffer[position + 4]
+            return 2 ** (value & 0x7F) if value & 0x80 else 10 ** value
+        position += 4 + (length + 3) // 4 * 4
+    return 10 ** 6
+
+
+def _walk_pcapng(buffer, tail):
+    data_offsets, caplens, orig_lens, timestamps, interfaces = (
+        array('q'), array('q'), array('q'), array('Q'), array('q'))
+    # (tipo de enlace, frações de segundo por segundo) de cada interface
+    descriptions = tail.descriptions
+    section = tail.section
+    endian = tail.endian
+    timestamp = tail.timestamp
+
+    position, size = tail.position, len(buffer)
+    while position + 12 <= size:
+        block_type = struct.unpack_from(endian + 'I', buffer, position)[0]
+        if block_type == 0x0A0D0D0A:
+            endian = '<' if bytes(buffer[position + 8:position + 12]) == b'\x4d\x3c\x2b\x1a' else '>'
+            section = len(descriptions)
+        block_length = struct.unpack_from(endian + 'I', buffer, position + 4)[0]
+        if block_length < 12 or position + block_length > size:
+            break
+
+        if block_type == 1:
+            linktype = struct.unpack_from(endian + 'H', buffer, position + 8)[0]
+            ticks = _interface_ticks(buffer, endian, position + 16, position + block_length - 4)
+            descriptions.append((linktype, ticks))
+        elif block_type in (2, 6):
+            if block_type == 6:
+                interface, high, low, caplen, orig_len = struct.unpack_from(endian + '5I', buffer, position + 8)
+            else:
+                interface, _, high, low, caplen, orig_len = struct.unpack_from(endian + 'HH4I', buffer, position + 8)
+            timestamp = (high << 32) | low
+            data_offsets.append(position + 28)
+            caplens.append(caplen)
+            orig_lens.append(orig_len)
+            timestamps.append(timestamp)
+            interfaces.append(section + interface)
+        elif block_type == 3:
+            # Simple Packet Block: sem timestamp, usa o do pacote anterior
+            orig_len = struct.unpack_from(endian + 'I', buffer, position + 8)[0]
+            data_offsets.append(position + 12)
+            caplens.append(min(orig_len, block_length - 16))
+            orig_lens.append(orig_len)
+            timestamps.append(timestamp)
+            interfaces.append(section)
+
+        position += block_length
+
+    tail.position, tail.endian, tail.section, tail.timestamp = position, endian, section, timestamp
+
+    interfaces = np.frombuffer(interfaces, dtype=np.int64)
+    linktypes = np.array([linktype for linktype, _ in descriptions] or [0], dtype=np.int32)
+    ticks = np.array([ticks for _, ticks in descriptions] or [10 ** 6], dtype=np.int64)
+    timestamps = np.frombuffer(timestamps, dtype=np.uint64)
+    packet_ticks = ticks[interfaces].astype(np.uint64)
+
+    return Records(
+        data_offsets=np.frombuffer(data_offsets, dtype=np.int64),
+        caplen=np.frombuffer(caplens, dtype=np.int64),
+        orig_len=np.frombuffer(orig_lens, dtype=np.int64),
+        seconds=(timestamps // packet_ticks).astype(np.int64),
+        fraction=(timestamps % packet_ticks).astype(np.int64),
+        ticks=packet_ticks.astype(np.int64),
+        linktypes=linktypes[interfaces],
+    )
+
+
+class Snapshot:
+    # Primeiros bytes de um lote de pacotes, lidos por deslocamento em cada linha
+    def __init__(self, packets):
+        self.packets = packets
+        self.flat = packets.ravel()
+        self.base = np.arange(len(packets)) * SNAP_BYTES
+
+    def byte(self, offsets):
+        return self.flat[self.base + np.minimum(offsets, SNAP_BYTES - 1)].astype(np.int64)
+
+    def u16(self, offsets):
+        return (self.byte(offsets) << 8) | self.byte(offsets + 1)
+
+    def copy_address(self, keys, rows, offsets, width, kind):
+        keys[rows, 0] = kind
+        offsets = np.broadcast_to(offsets, self.base.shape)[rows]
+        columns = np.minimum(offsets[:, None] + np.arange(width), SNAP_BYTES - 1)
+        keys[rows, 17 - width:] = self.flat[self.base[rows, None] + columns]
+
+
+def _lookup_ports(table, source_port, destination_port):
+    # Como o Wireshark, tenta primeiro a menor porta
+    low = np.minimum(source_port, destination_port)
+    high = np.maximum(source_port, destination_port)
+    code = table[low]
+    return np.where(code >= 0, code, table[high])
+
+
+def _decode(packets, linktypes):
+    # Decodifica enlace, rede e transporte de um lote de pacotes.
+    # Retorna as chaves de origem/destino e o código do protocolo
+    n = len(packets)
+    snapshot = Snapshot(packets)
+    ethernet = linktypes == LINKTYPE_ETHERNET
+    sll = linktypes == LINKTYPE_LINUX_SLL
+    sll2 = linktypes == LINKTYPE_LINUX_SLL2
+    raw_ip = np.isin(linktypes, (LINKTYPE_RAW, LINKTYPE_IPV4, LINKTYPE_IPV6))
+
+    ethertype = np.select([ethernet, sll, sll2], [snapshot.u16(12), snapshot.u16(14), snapshot.u16(0)], 0)
+    l3 = np.select([ethernet, sll, sll2], [14, 16, 20], 0)
+    vlan = ethernet & np.isin(ethertype, ETHERTYPE_VLAN)
+    ethertype = np.where(vlan, snapshot.u16(16), ethertype)
+    l3 = np.where(vlan, 18, l3)
+
+    version = packets[:, 0] >> 4
+    ethertype[raw_ip & (version == 4)] = ETHERTYPE_IPV4
+    ethertype[raw_ip & (version == 6)] = ETHERTYPE_IPV6
+
+    ipv4 = ethertype == ETHERTYPE_IPV4
+    ipv6 = ethertype == ETHERTYPE_IPV6
+    ip = ipv4 | ipv6
+
+    # Quadros 802.3 (campo de tamanho no lugar do ethertype)
+    llc = ethernet & (ethertype < 0x0600)
+    stp = llc & (packets[:, 0] == 0x01) & (packets[:, 1] == 0x80) & (packets[:, 2] == 0xC2)
+
+    header_length = np.where(ipv4, (snapshot.byte(l3) & 0x0F) * 4, 40)
+    protocol = np.where(ipv4, snapshot.byte(l3 + 9), snapshot.byte(l3 + 6))
+    fragment = ipv4 & ((snapshot.u16(l3 + 6) & 0x1FFF) != 0)
+    l4 = l3 + header_length
+    payload_length = np.where(ipv4, snapshot.u16(l3 + 2) - header_length, snapshot.u16(l3 + 4))
+
+    tcp = ip & ~fragment & (protocol == 6)
+    udp = ip & ~fragment & (protocol == 17)
+    source_port = snapshot.u16(l4)
+    destination_port = snapshot.u16(l4 + 2)
+    tcp_payload = payload_length - (snapshot.byte(l4 + 12) >> 4) * 4
+
+    code = np.full(n, -1, dtype=np.int64)
+    # Protocolos de aplicação identificados pelas portas. Segmentos TCP sem
+    # dados (ACKs) ficam como TCP, como no Wireshark
+    application = np.where(tcp & (tcp_payload > 0), _lookup_ports(TCP_TABLE, source_port, destination_port),
+                           np.where(udp, _lookup_ports(UDP_TABLE, source_port, destination_port), -1))
+    code = np.where(application >= 0, application, code)
+    transport = np.where(ip & ~fragment, IP_PROTOCOL_TABLE[protocol & 0xFF], -1)
+    code = np.where(code >= 0, code, transport)
+    network = np.where(ipv4, CODE['IPv4'], np.where(ipv6, CODE['IPv6'], -1))
+    code = np.where(code >= 0, code, network)
+    code = np.where(code >= 0, code, np.where(stp, CODE['STP'], np.where(llc, CODE['LLC'], -1)))
+    link = ETHERTYPE_TABLE[ethertype & 0xFFFF]
+    code = np.where(code >= 0, code, link)
+    # Ethertypes desconhecidos viram códigos acima da lista de protocolos
+    code = np.where(code >= 0, code, len(PROTOCOLS) + ethertype)
+
+    source = np.zeros((n, 17), dtype=np.uint8)
+    destination = np.zeros((n, 17), dtype=np.uint8)
+    rows = np.flatnonzero(ipv4)
+    snapshot.copy_address(source, rows, l3 + 12, 4, ADDRESS_IPV4)
+    snapshot.copy_address(destination, rows, l3 + 16, 4, ADDRESS_IPV4)
+    rows = np.flatnonzero(ipv6)
+    snapshot.copy_address(source, rows, l3 + 8, 16, ADDRESS_IPV6)
+    snapshot.copy_address(destination, rows, l3 + 24, 16, ADDRESS_IPV6)
+    # Sem endereço IP, usa os endereços MAC, como o Wireshark
+    rows = np.flatnonzero(ethernet & ~ip)
+    snapshot.copy_address(source, rows, 6, 6, ADDRESS_MAC)
+    snapshot.copy_address(destination, rows, 0, 6, ADDRESS_MAC)
+    rows = np.flatnonzero((sll | sll2) & ~ip)
+    snapshot.copy_address(source, rows, np.where(sll, 6, 12), 6, ADDRESS_MAC)
+
+    return source, destination, code
+
+
+# Copia os primeiros SNAP_BYTES de cada pacote, lendo direto do arquivo mapeado
+def _snap(raw, windows, offsets):
+    packets = np.zeros((len(offsets), SNAP_BYTES), dtype=np.uint8)
+    inside = offsets <= len(raw) - SNAP_BYTES
+    if windows is not None:
+        packets[inside] = windows[offsets[inside]]
+    # Pacotes curtos no fim do arquivo
+    for row in np.flatnonzero(~inside):
+        tail = raw[offsets[row]:]
+        packets[row, :len(tail)] = tail
+    return packets
+
+
+# Códigos das chaves de endereço (tipo + 16 bytes). Endereços MAC e IPv4
+# cabem em um inteiro de 64 bits e são agrupados por hash; só os IPv6
+# precisam da ordenação das chaves completas
+def _factorize(keys):
+    codes = np.empty(len(keys), dtype=np.int64)
+    ipv6 = keys[:, 0] == ADDRESS_IPV6
+
+    short = np.zeros((int((~ipv6).sum()), 8), dtype=np.uint8)
+    short[:, :7] = keys[~ipv6][:, [0, 11, 12, 13, 14, 15, 16]]
+    short_codes, short_keys = pd.factorize(short.view(np.uint64).ravel())
+    codes[~ipv6] = short_codes
+    uniques = []
+    for key in short_keys.astype(np.uint64).view(np.uint8).reshape(-1, 8):
+        full = bytearray(17)
+        full[0] = key[0]
+        full[11:] = key[1:7].tobytes()
+        uniques.append(bytes(full))
+
+    long_keys, long_codes = np.unique(keys[ipv6].view(ADDRESS_KEY).ravel(), return_inverse=True)
+    codes[ipv6] = long_codes + len(uniques)
+    uniques.extend(bytes(key) for key in long_keys)
+    return uniques, codes
+
+
+def _format_address(key):
+    key = bytes(key)
+    if key[0] == ADDRESS_IPV4:
+        return str(ipaddress.IPv4Address(key[13:]))
+    if key[0] == ADDRESS_IPV6:
+        return str(ipaddress.IPv6Address(key[1:]))
+    if key[0] == ADDRESS_MAC:
+        if key[11:] == b'\xff' * 6:
+            return 'Broadcast'
+        return ':'.join(f'{byte:02x}' for byte in key[11:])
+    return None
+
+
+def _protocol_name(code):
+    if code < len(PROTOCOLS):
+        return PROTOCOLS[code]
+    return f'0x{code - len(PROTOCOLS):04x}'
+
+
+# Lê um arquivo pcap ou pcapng. Se informado, progress é chamado a cada
+# lote com os pacotes lidos, a fração concluída e os pacotes por segundo.
+# Com um Tail, lê apenas os pacotes gravados desde a leitura anterior
+def read_pcap(path, progress=None, tail=None):
+    if tail is None:
+        tail = Tail()
+    started = time.perf_counter()
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+        raw = np.frombuffer(buffer, dtype=np.uint8)
+        windows = np.lib.stride_tricks.sliding_window_view(raw, SNAP_BYTES) if len(raw) >= SNAP_BYTES else None
+        if bytes(buffer[:4]) == PCAPNG_MAGIC:
+            records = _walk_pcapng(buffer, tail)
+        else:
+            records = _walk_pcap(buffer, raw, tail)
+
+        n = len(records.data_offsets)
+        # Códigos dos endereços, compartilhados entre Source e Destination
+        addresses = {}
+        source_codes = np.empty(n, dtype=np.int32)
+        destination_codes = np.empty(n, dtype=np.int32)
+        protocol_codes = np.empty(n, dtype=np.int64)
+
+        for start in range(0, n, BATCH_PACKETS):
+            batch = slice(start, start + BATCH_PACKETS)
+            offsets = records.data_offsets[batch]
+            caplen = records.caplen[batch]
+
+            packets = _snap(raw, windows, offsets)
+            packets[np.arange(SNAP_BYTES) >= caplen[:, None]] = 0
+
+            source, destination, protocol_codes[batch] = _decode(packets, records.linktypes[batch])
+
+            keys, inverse = _factorize(np.concatenate([source, destination]))
+            key_codes = np.array([addresses.setdefault(key, len(addresses)) for key in keys],
+                                 dtype=np.int32)
+            count = len(source)
+            source_codes[batch] = key_codes[inverse[:count]]
+            destination_codes[batch] = key_codes[inverse[count:]]
+
+            if progress is not None:
+                done = min(start + BATCH_PACKETS, n)
+                elapsed = time.perf_counter() - started
+                progress(done, done / n, done / elapsed if elapsed else 0.0)
+
+        del raw, windows
+
+    # Pacotes sem endereço ficam vazios (NaN), como no CSV
+    names = [_format_address(key) for key in addresses]
+    categories = sorted({name for name in names if name is not None})
+    position = {name: code for code, name in enumerate(categories)}
+    lookup = np.array([position.get(name, -1) for name in names], dtype=np.int32)
+
+    protocols, protocol_index = np.unique(protocol_codes, return_inverse=True)
+
+    if n and tail.origin is None:
+        tail.origin = (records.seconds[0], records.fraction[0] / records.ticks[0])
+    if n:
+        time_column = ((records.seconds - tail.origin[0])
+                       + (records.fraction / records.ticks - tail.origin[1]))
+    else:
+        time_column = np.zeros(0)
+
+    first = tail.packets + 1
+    tail.packets += n
+    return pd.DataFrame({
+        'No.': np.arange(first, first + n, dtype=np.uint32),
+        'Time': time_column.astype(np.float64),
+        'Source': pd.Categorical.from_codes(lookup[source_codes], categories),
+        'Destination': pd.Categorical.from_codes(lookup[destination_codes], categories),
+        'Protocol': pd.Categorical.from_codes(protocol_index,
+                                              [_protocol_name(code) for code in protocols]),
+        'Length': records.orig_len.astype(np.uint32),
+    })
@@ -0,0 +1,196 @@
+# Estatísticas calculadas em uma única passada, bloco a bloco. Os resumos
+# de blocos ou processos diferentes podem ser combinados com merge
+import math
+
+import lazy
+
+np = lazy.module('numpy')
+pd = lazy.module('pandas')
+
+# Parâmetro k do esboço KLL. O erro de posição dos quantis fica em torno
+# de 1/k do total de valores
+SKETCH_K = 400
+
+# Quantis apresentados junto com média e desvio padrão, como no describe()
+PERCENTILES = (0.25, 0.5, 0.75)
+
+# Semente do esboço de quantis: a mesma captura, lida nos mesmos blocos,
+# tem sempre os mesmos quartis (no dashboard e na análise em lote)
+SKETCH_SEED = 0
+
+
+# Valores como float64, sem NaN e infinitos
+def finite(values):
+    values = np.asarray(values, dtype=np.float64)
+    return values[np.isfinite(values)]
+
+
+class RunningStats:
+    # Contagem, média, variância (Welford), mínimo e máximo
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def update(self, values):
+        values = finite(values)
+        if len(values) == 0:
+            return
+        # O bloco é resumido de uma vez e combinado com o acumulado
+        chunk = RunningStats()
+        chunk.count = len(values)
+        chunk.mean = float(values.mean())
+        chunk.m2 = float(((values - chunk.mean) ** 2).sum())
+        chunk.min = float(values.min())
+        chunk.max = float(values.max())
+        self.merge(chunk)
+
+    def merge(self, other):
+        # Combinação de Chan, Golub e LeVeque para médias e variâncias parciais
+        if other.count == 0:
+            return
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.m2 += other.m2 + delta ** 2 * self.count * other.count / count
+        self.mean += delta * other.count / count
+        self.count = count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    @property
+    def variance(self):
+        return self.m2 / (self.count - 1) if self.count > 1 else math.nan
+
+    @property
+    def std(self):
+        return math.sqrt(self.variance) if self.count > 1 else math.nan
+
+
+class QuantileSketch:
+    # Esboço KLL (Karnin, Lang e Liberty, 2016). Cada nível guarda valores
+    # com peso 2**nível; quando um nível passa da capacidade, seus valores
+    # são ordenados e metade deles, alternados, sobe para o nível seguinte
+    def __init__(self, k=SKETCH_K, seed=SKETCH_SEED):
+        self.k = k
+        self.count = 0
+        self.levels = [np.zeros(0)]
+        self._rng = np.random.default_rng(seed)
+
+    def _capacity(self, level):
+        depth = len(self.levels) - level - 1
+        return max(int(math.ceil(self.k * (2 / 3) ** depth)), 2)
+
+    def update(self, values):
+        values = finite(values)
+        if len(values) == 0:
+            return
+        self.count += len(values)
+        self.levels[0] = np.concatenate((self.levels[0], values))
+        self._compress()
+
+    def merge(self, other):
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.zeros(0))
+        for level, items in enumerate(other.levels):
+            self.levels[level] = np.concatenate((self.levels[level], items))
+        self.count += other.count
+        self._compress()
+
+    def _compress(self):
+        level = 0
+        while level < len(self.levels):
+            items = self.levels[level]
+            if len(items) > self._capacity(level):
+                if level + 1 == len(self.levels):
+                    self.levels.append(np.zeros(0))
+                items = np.sort(items)
+                # Com quantidade ímpar, um valor fica no nível para manter o peso total
+                kept, items = items[:len(items) % 2], items[len(items) % 2:]
+                promoted = items[self._rng.integers(2)::2]
+                self.levels[level] = kept
+                self.levels[level + 1] = np.concatenate((self.levels[level + 1], promoted))
+            level += 1
+
+    def quantile(self, q):
+        if self.count == 0:
+            return math.nan
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(level_items), 2 ** level, dtype=np.int64)
+                                  for level, level_items in enumerate(self.levels)])
+        order = np.argsort(items, kind='stable')
+        cumulative = np.cumsum(weights[order])
+        i = int(np.searchsorted(cumulative, q * cumulative[-1]))
+        return float(items[order[min(i, len(order) - 1)]])
+
+
+class ColumnSummary:
+    # Resumo de uma coluna numérica: estatísticas exatas e quantis aproximados
+    def __init__(self, k=SKETCH_K):
+        self.stats = RunningStats()
+        self.sketch = QuantileSketch(k)
+
+    def update(self, values):
+        values = finite(values)
+        self.stats.update(values)
+        self.sketch.update(values)
+
+    def merge(self, other):
+        self.stats.merge(other.stats)
+        self.sketch.merge(other.sketch)
+
+    def describe(self):
+        return describe(self.stats, [self.sketch.quantile(q) for q in PERCENTILES])
+
+
+# Mesmo formato de pandas.Series.describe(), com os quantis de PERCENTILES
+def describe(stats, quantiles):
+    empty = stats.count == 0
+    return pd.Series(
+        {'count': float(stats.count),
+         'mean': math.nan if empty else stats.mean,
+         'std': stats.std,
+         'min': math.nan if empty else stats.min,
+         **{f"{q:.0%}": value for q, value in zip(PERCENTILES, quantiles)},
+         'max': math.nan if empty else stats.max})
+
+
+class SpaceSaving:
+    # Contagens por valor no estilo Space-Saving (Metwally, Agrawal e El
+    # Abbadi, 2005), guardando no máximo capacity valores. A contagem de cada
+    # valor guardado é superestimada em no máximo errors[valor]; um valor
+    # descartado aparece no máximo floor vezes. Sem capacidade, é exata
+    def __init__(self, capacity=None):
+        self.capacity = capacity
+        self.counts = pd.Series(dtype=np.int64)
+        self.errors = pd.Series(dtype=np.int64)
+        self.floor = 0
+
+    def update(self, counts):
+        # counts: contagens exatas de um bloco, indexadas pelo valor
+        chunk = SpaceSaving(self.capacity)
+        chunk.counts = counts.astype(np.int64)
+        chunk.errors = pd.Series(0, index=counts.index, dtype=np.int64)
+        self.merge(chunk)
+
+    def merge(self, other):
+        # Um valor ausente de um dos resumos pode ter aparecido lá até floor vezes
+        index = self.counts.index.union(other.counts.index)
+        self.counts = (self.counts.reindex(index, fill_value=self.floor)
+                       + other.counts.reindex(index, fill_value=other.floor))
+        self.errors = (self.errors.reindex(index, fill_value=self.floor)
+                       + other.errors.reindex(index, fill_value=other.floor))
+        self.floor += other.floor
+
+        if self.capacity is not None and len(self.counts) > self.capacity:
+            order = np.argsort(-self.counts.to_numpy(), kind='stable')
+            kept, dropped = order[:self.capacity], order[self.capacity:]
+            self.floor = max(self.floor, int(self.counts.iloc[dropped].max()))
+            self.counts = self.counts.iloc[kept]
+            self.errors = self.errors.iloc[kept]
+
+    def top(self, n=None):
+        # Valores mais frequentes, em ordem decrescente de contagem
+        counts = self.counts.sort_values(ascending=False, kind='stable')
+        return counts if n is None else counts.head(n)
@@ -0,0 +1,138 @@
+import contextlib
+import os
+import pickle
+import shutil
+import sqlite3
+import time
+import uuid
+
+import config
+import lazy
+
+feather = lazy.module('pyarrow.feather')
+
+FRAME_FILE = 'frame.feather'
+
+# Versão do formato dos agregados. Nas capturas gravadas com outra versão,
+# os agregados são recalculados a partir do frame ao abri-las
+AGGREGATES_VERSION = 2
+AGGREGATES_NAME = f'aggregates-v{AGGREGATES_VERSION}'
+
+
+class DatasetStore:
+    # Capturas convertidas para Arrow IPC (Feather) e um catálogo em sqlite.
+    # Cada captura fica em um diretório nomeado pelo digest do arquivo original.
+    # Como tudo fica em disco, vários processos (workers do gunicorn) podem
+    # compartilhar o mesmo armazenamento
+    def __init__(self, directory=config.DATA_DIR):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        with self._connect() as connection:
+            # WAL permite leituras concorrentes enquanto outro processo grava
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS datasets ('
+                'digest TEXT PRIMARY KEY, name TEXT, rows INTEGER, created REAL)'
+            )
+            # Cenários de cada sessão de usuário
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS sessions ('
+                'session TEXT, digest TEXT, name TEXT, added REAL, '
+                'PRIMARY KEY (session, digest))'
+            )
+
+    @contextlib.contextmanager
+    def _connect(self):
+        connection = sqlite3.connect(os.path.join(self.directory, 'catalog.sqlite'), timeout=30)
+        try:
+            with connection:
+                yield connection
+        finally:
+            connection.close()
+
+    def path(self, digest):
+        return os.path.join(self.directory, digest)
+
+    def contains(self, digest):
+        return os.path.isdir(self.path(digest))
+
+    def save(self, digest, name, df, aggregates):
+        # Grava em um diretório temporário e renomeia, para que leitores
+        # nunca vejam uma captura pela metade
+        staging = self.path(f'{digest}.{uuid.uuid4().hex}.tmp')
+        os.makedirs(staging)
+        try:
+            # Sem compressão, para que as colunas possam ser mapeadas em memória
+            df.to_feather(os.path.join(staging, FRAME_FILE), compression='uncompressed')
+            with open(os.path.join(staging, f'{AGGREGATES_NAME}.pickle'), 'wb') as f:
+                pickle.dump(aggregates, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.rename(staging, self.path(digest))
+        except OSError:
+            # Outro processo já gravou a mesma captura
+            if not self.contains(digest):
+                raise
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+
+        with self._connect() as connection:
+            connection.execute(
+                'INSERT OR REPLACE INTO datasets (digest, name, rows, created) VALUES (?, ?, ?, ?)',
+                (digest, name, len(df), time.time()),
+            )
+
+    def load(self, digest):
+        if not self.contains(digest):
+            return None
+        table = feather.read_table(os.path.join(self.path(digest), FRAME_FILE), memory_map=True)
+        df = table.to_pandas(split_blocks=True, self_destruct=True)
+        return df, self.load_aggregates(digest)
+
+    # Apenas os agregados, sem ler o frame (ex.: na comparação de cenários).
+    # None se a captura não existe ou foi gravada com outra versão
+    def load_aggregates(self, digest):
+        return self.load_derived(digest, AGGREGATES_NAME)
+
+    def save_aggregates(self, digest, aggregates):
+        self.save_derived(digest, AGGREGATES_NAME, aggregates)
+
+    # Resultados caros derivados de uma captura (ex.: o layout do grafo),
+    # guardados junto dela para não serem recalculados após reiniciar
+    def load_derived(self, digest, name):
+        try:
+            with open(os.path.join(self.path(digest), f'{name}.pickle'), 'rb') as f:
+                return pickle.load(f)
+        except FileNotFoundError:
+            return None
+
+    def save_derived(self, digest, name, value):
+        if not self.contains(digest):
+            return
+        path = os.path.join(self.path(digest), f'{name}.pickle')
+        staging = f'{path}.{uuid.uuid4().hex}.tmp'
+        with open(staging, 'wb') as f:
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(staging, path)
+
+    def catalog(self):
+        with self._connect() as connection:
+            rows = connection.execute(
+                'SELECT digest, name, rows, created FROM datasets ORDER BY created'
+            ).fetchall()
+        return [dict(zip(['digest', 'name', 'rows', 'created'], row)) for row in rows]
+
+    def add_to_session(self, session, digest, name):
+        with self._connect() as connection:
+            connection.execute(
+                'INSERT OR IGNORE INTO sessions (session, digest, name, added) VALUES (?, ?, ?, ?)',
+                (session, digest, name, time.time()),
+            )
+
+    def session_catalog(self, session):
+        with self._connect() as connection:
+            rows = connection.execute(
+                'SELECT sessions.digest, sessions.name, datasets.rows, sessions.added '
+                'FROM sessions JOIN datasets ON datasets.digest = sessions.digest '
+                'WHERE sessions.session = ? ORDER BY sessions.added',
+                (session,),
+            ).fetchall()
+        return [dict(zip(['digest', 'name', 'rows', 'created'], row)) for row in rows]
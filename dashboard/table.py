@@ -0,0 +1,195 @@
+import math
+import threading
+from collections import OrderedDict
+
+import config
+import lazy
+import metrics
+import timeline
+
+np = lazy.module('numpy')
+pd = lazy.module('pandas')
+
+# Quantidade de pacotes por página da tabela de detalhes
+PAGE_SIZE = 50
+
+# Operadores da sintaxe filter_query do DataTable
+operators = [['ge ', '>='],
+             ['le ', '<='],
+             ['lt ', '<'],
+             ['gt ', '>'],
+             ['ne ', '!='],
+             ['eq ', '='],
+             ['contains '],
+             ['datestartswith ']]
+
+
+def split_filter_part(filter_part):
+    for operator_type in operators:
+        for operator in operator_type:
+            if operator in filter_part:
+                name_part, value_part = filter_part.split(operator, 1)
+                name = name_part[name_part.find('{') + 1: name_part.rfind('}')]
+
+                value_part = value_part.strip()
+                # Termo ainda sem valor, enquanto o usuário digita
+                if not value_part:
+                    return [None] * 3
+                v0 = value_part[0]
+                if v0 == value_part[-1] and v0 in ("'", '"', '`'):
+                    value = value_part[1: -1].replace('\\' + v0, v0)
+                else:
+                    try:
+                        value = float(value_part)
+                    except ValueError:
+                        value = value_part
+
+                return name, operator_type[0].strip(), value
+
+    return [None] * 3
+
+
+# Máscara de um único termo do filtro, ou None se o valor não pode ser
+# comparado com a coluna (texto em uma coluna numérica)
+def filter_mask(column, operator, value):
+    # Em colunas categóricas o filtro é avaliado só nas categorias
+    if isinstance(column.dtype, pd.CategoricalDtype):
+        categories = pd.Series(column.cat.categories)
+        matched = filter_mask(categories, operator, value)
+        if matched is None:
+            return None
+        matched = np.append(matched.to_numpy(dtype=bool), False)
+        return pd.Series(matched[column.cat.codes.to_numpy()], index=column.index)
+
+    if operator == 'contains' or operator == 'datestartswith':
+        strings = column.astype(str)
+        if operator == 'contains':
+            return strings.str.contains(str(value), regex=False)
+        return strings.str.startswith(str(value))
+
+    if pd.api.types.is_numeric_dtype(column):
+        if isinstance(value, str):
+            try:
+                value = float(value)
+            except ValueError:
+                return None
+    else:
+        if isinstance(value, float) and value.is_integer():
+            value = int(value)
+        value = str(value)
+        column = column.astype(str)
+
+    if operator == 'eq':
+        return column == value
+    if operator == 'ne':
+        return column != value
+    if operator == 'lt':
+        return column < value
+    if operator == 'le':
+        return column <= value
+    if operator == 'gt':
+        return column > value
+    return column >= value
+
+
+# Posições das linhas que passam no filtro, na ordem pedida. Com rows (um
+# recorte ou um array de posições), apenas essas linhas são consideradas.
+# Sem filtro nem ordenação, devolve rows sem copiá-lo (None: todas)
+def select_rows(df, filter_query, sort_by, rows=None):
+    if rows is not None:
+        selected = select_rows(df.iloc[rows], filter_query, sort_by)
+        if selected is None:
+            return rows
+        if isinstance(rows, slice):
+            return selected + rows.start
+        return rows[selected]
+
+    positions = None
+
+    if filter_query:
+        mask = np.ones(len(df), dtype=bool)
+        for filter_part in filter_query.split(' && '):
+            col_name, operator, filter_value = split_filter_part(filter_part)
+            if col_name not in df.columns:
+                continue
+            term = filter_mask(df[col_name], operator, filter_value)
+            if term is None:
+                continue
+            mask &= term.to_numpy(dtype=bool)
+        positions = np.flatnonzero(mask)
+
+    if sort_by:
+        sort_by = [col for col in sort_by if col['column_id'] in df.columns]
+    if sort_by:
+        columns = [col['column_id'] for col in sort_by]
+        keys = df[columns] if positions is None else df[columns].iloc[positions]
+        order = keys.reset_index(drop=True).sort_values(
+            columns,
+            ascending=[col['direction'] == 'asc' for col in sort_by],
+            kind='stable',
+        ).index.to_numpy()
+        positions = order if positions is None else positions[order]
+
+    return positions
+
+
+# Posições em uint32 quando a tabela cabe nele: metade da memória de int64
+def compact_positions(positions, row_count):
+    if isinstance(positions, np.ndarray) and row_count <= 2 ** 32:
+        return positions.astype(np.uint32, copy=False)
+    return positions
+
+
+class TableViews:
+    # Ordem das linhas de cada filtro/ordenação já consultado, para que a
+    # troca de página seja apenas um recorte. As ordens ocupam no máximo
+    # max_bytes; as usadas há mais tempo são descartadas. frame escolhe a
+    # tabela de cada captura; sem ele, a dos pacotes
+    def __init__(self, max_bytes=config.TABLE_VIEWS_MB * 2 ** 20, frame=None):
+        self.max_bytes = max_bytes
+        self.frame = frame if frame is not None else (lambda dataset: dataset.df)
+        self._views = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def rows(self, dataset, filter_query, sort_by, window=None):
+        span = timeline.time_span(dataset.aggregates, window)
+        key = (dataset.digest, filter_query or '',
+               tuple((col['column_id'], col['direction']) for col in sort_by or []), span)
+        with self._lock:
+            if key in self._views:
+                self._views.move_to_end(key)
+                return self._views[key]
+
+        rows = None if span is None else timeline.time_index(dataset).rows(*span)
+        frame = self.frame(dataset)
+        with metrics.stage('select'):
+            positions = compact_positions(select_rows(frame, filter_query, sort_by, rows), len(frame))
+        size = positions.nbytes if isinstance(positions, np.ndarray) else 0
+        if size > self.max_bytes:
+            return positions
+        with self._lock:
+            if key not in self._views:
+                self._views[key] = positions
+                self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, evicted = self._views.popitem(last=False)
+                self._bytes -= evicted.nbytes if isinstance(evicted, np.ndarray) else 0
+        return positions
+
+    def page(self, dataset, page_current, page_size, filter_query, sort_by, window=None):
+        positions = self.rows(dataset, filter_query, sort_by, window)
+        df = self.frame(dataset)
+        if isinstance(positions, slice):
+            df, positions = df.iloc[positions], None
+        row_count = len(df) if positions is None else len(positions)
+        page_count = max(math.ceil(row_count / page_size), 1)
+
+        # Apenas a página visível é convertida em registros
+        start = page_current * page_size
+        if positions is None:
+            page = df.iloc[start:start + page_size]
+        else:
+            page = df.iloc[positions[start:start + page_size]]
+        with metrics.stage('records'):
+            return page.to_dict('records'), page_count
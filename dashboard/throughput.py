@@ -0,0 +1,160 @@
+# Vazão (pacotes/s e bytes/s) por protocolo, a partir de totais por balde
+# de tempo em várias resoluções, calculados na ingestão. Os gráficos usam
+# sempre esses totais, nunca os pacotes. Os totais ficam em um arquivo à
+# parte no armazenamento, lido apenas pela aba de vazão
+import math
+
+import lazy
+
+np = lazy.module('numpy')
+pd = lazy.module('pandas')
+
+# Resoluções, em milissegundos, da mais fina para a mais grossa
+RESOLUTIONS_MS = (1, 1000, 60000)
+
+# Pontos por protocolo enviados ao navegador; a resolução do gráfico é a
+# mais fina que cabe nesse limite
+MAX_POINTS = 2000
+
+# Bits reservados ao código do protocolo na chave (balde, protocolo)
+PROTOCOL_BITS = 16
+
+# Nome dos totais entre os resultados derivados de uma captura
+DERIVED_NAME = 'throughput'
+
+
+class Rollup:
+    # Pacotes e bytes de cada par (balde, protocolo) não vazio, em ordem de balde
+    def __init__(self, resolution_ms, buckets, protocols, packets, bytes_):
+        self.resolution_ms = resolution_ms
+        self.buckets = buckets
+        self.protocols = protocols
+        self.packets = packets
+        self.bytes = bytes_
+
+    @property
+    def seconds(self):
+        return self.resolution_ms / 1000
+
+    def coarsen(self, resolution_ms):
+        factor = resolution_ms // self.resolution_ms
+        return rollup(resolution_ms, self.buckets // factor, self.protocols, self.packets, self.bytes)
+
+    def cut(self, lo, hi):
+        return Rollup(self.resolution_ms, self.buckets[lo:hi], self.protocols[lo:hi],
+                      self.packets[lo:hi], self.bytes[lo:hi])
+
+
+def rollup(resolution_ms, buckets, protocols, packets, bytes_):
+    keys, inverse = np.unique((buckets << PROTOCOL_BITS) | protocols, return_inverse=True)
+    return Rollup(resolution_ms, keys >> PROTOCOL_BITS, (keys & ((1 << PROTOCOL_BITS) - 1)).astype(np.uint16),
+                  np.bincount(inverse, weights=packets).astype(np.uint32),
+                  np.bincount(inverse, weights=bytes_).astype(np.uint64))
+
+
+def concat(parts):
+    return Rollup(parts[0].resolution_ms, *(np.concatenate([getattr(part, name) for part in parts])
+                                            for name in ('buckets', 'protocols', 'packets', 'bytes')))
+
+
+def append(segments, part):
+    # Acrescenta part aos segmentos de uma resolução: rollups em ordem de
+    # balde, sem baldes em comum. Só os baldes a partir do primeiro de part
+    # são somados de novo, e segmentos vizinhos de tamanho parecido são
+    # unidos, para que fiquem O(log n) segmentos
+    if len(part.buckets) == 0:
+        return
+    while segments and segments[-1].buckets[-1] >= part.buckets[0]:
+        last = segments.pop()
+        split = int(np.searchsorted(last.buckets, part.buckets[0]))
+        merged = concat([last.cut(split, None), part])
+        part = rollup(part.resolution_ms, merged.buckets, merged.protocols.astype(np.int64),
+                      merged.packets, merged.bytes)
+        if split:
+            segments.append(last.cut(0, split))
+            break
+    segments.append(part)
+    while len(segments) > 1 and len(segments[-2].buckets) <= 2 * len(segments[-1].buckets):
+        last = segments.pop()
+        segments[-1] = concat([segments[-1], last])
+
+
+class Throughput:
+    def __init__(self, protocols, levels):
+        self.protocols = protocols
+        # Segmentos de cada resolução de RESOLUTIONS_MS (ver append)
+        self.levels = levels
+
+    def series(self, start=None, end=None, max_points=MAX_POINTS):
+        # Vazão por protocolo em [start, end) segundos, na resolução mais fina
+        # com no máximo max_points baldes. Baldes sem pacotes valem zero
+        finest = self.levels[0]
+        if not finest:
+            return None, pd.DataFrame(columns=['Time', 'Protocol', 'Pacotes/s', 'Bytes/s'])
+        if start is None:
+            start = finest[0].buckets[0] * finest[0].seconds
+        if end is None:
+            end = (finest[-1].buckets[-1] + 1) * finest[-1].seconds
+
+        segments = next((segments for segments in self.levels if (end - start) / segments[0].seconds <= max_points),
+                        self.levels[-1])
+        seconds = segments[0].seconds
+        first = math.floor(start / seconds)
+        last = math.ceil(end / seconds)
+        level = concat([segment.cut(*np.searchsorted(segment.buckets, [first, last])) for segment in segments])
+        buckets = level.buckets - first
+        protocols = level.protocols.astype(np.int64)
+
+        present, columns = np.unique(protocols, return_inverse=True)
+        shape = (last - first, len(present))
+        packets = np.zeros(shape)
+        packets[buckets, columns] = level.packets
+        bytes_ = np.zeros(shape)
+        bytes_[buckets, columns] = level.bytes
+
+        times = (first + np.arange(shape[0])) * seconds
+        frame = pd.DataFrame({
+            'Time': np.repeat(times, shape[1]),
+            'Protocol': np.tile(np.asarray(self.protocols, dtype=object)[present], shape[0]),
+            'Pacotes/s': packets.ravel() / seconds,
+            'Bytes/s': bytes_.ravel() / seconds,
+        })
+        return level, frame
+
+
+class ThroughputBuilder:
+    # Totais acumulados bloco a bloco, em todas as resoluções. Os códigos de
+    # protocolo de cada bloco são traduzidos para uma numeração única. Cada
+    # bloco custa o seu tamanho, sem refazer os anteriores (capturas ao vivo)
+    def __init__(self):
+        self.protocol_ids = {}
+        self.levels = [[] for _ in RESOLUTIONS_MS]
+
+    def update(self, chunk):
+        protocol = chunk["Protocol"]
+        ids = np.array([self.protocol_ids.setdefault(str(name), len(self.protocol_ids))
+                        for name in protocol.cat.categories] + [-1], dtype=np.int64)
+        # Código -1 (protocolo ausente) aponta para o último elemento, -1
+        codes = ids[protocol.cat.codes.to_numpy()]
+        valid = codes >= 0
+        buckets = np.floor(chunk["Time"].to_numpy(dtype=np.float64)[valid] * 1000).astype(np.int64)
+        part = rollup(RESOLUTIONS_MS[0], buckets, codes[valid], np.ones(len(buckets)),
+                      chunk["Length"].to_numpy(dtype=np.float64)[valid])
+        for segments, resolution_ms in zip(self.levels, RESOLUTIONS_MS):
+            if resolution_ms != part.resolution_ms:
+                part = part.coarsen(resolution_ms)
+            append(segments, part)
+
+    def throughput(self):
+        return Throughput(list(self.protocol_ids), [list(segments) for segments in self.levels])
+
+
+# Totais da captura: gravados na ingestão ou, nas capturas gravadas antes
+# deles existirem, calculados a partir do frame
+def dataset_throughput(dataset):
+    def compute(df):
+        builder = ThroughputBuilder()
+        if len(df):
+            builder.update(df)
+        return builder.throughput()
+    return dataset.derived(DERIVED_NAME, compute, persist=True)
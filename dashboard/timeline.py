@@ -0,0 +1,224 @@
+# Índice temporal de uma captura: os pacotes em ordem de Time e agregados
+# por segundo e por minuto. Uma janela de tempo vira uma busca binária e a
+# combinação dos baldes que ela cobre, sem filtrar o frame inteiro
+
+import analysis
+import distribution
+import lazy
+import metrics
+import stats
+
+np = lazy.module('numpy')
+pd = lazy.module('pandas')
+
+# Larguras dos baldes, em segundos, da menor para a maior. As janelas são
+# alinhadas à menor delas
+BUCKET_SECONDS = (1, 60)
+
+# Nome do índice no armazenamento da captura
+DERIVED_NAME = 'time_index'
+
+
+class Moments:
+    # Contagem, média, soma dos quadrados dos desvios (M2), mínimo e máximo
+    # de cada balde. Valores NaN (o intervalo do primeiro pacote) não contam
+    def __init__(self, values, starts):
+        heads = starts[:-1]
+        valid = np.isfinite(values)
+        filled = np.where(valid, values, 0.0)
+        self.count = np.add.reduceat(valid.astype(np.int64), heads)
+        self.mean = np.divide(np.add.reduceat(filled, heads), self.count,
+                              out=np.zeros(len(heads)), where=self.count > 0)
+        deviations = np.where(valid, filled - np.repeat(self.mean, np.diff(starts)), 0.0)
+        self.m2 = np.add.reduceat(deviations ** 2, heads)
+        self.min = np.minimum.reduceat(np.where(valid, values, np.inf), heads)
+        self.max = np.maximum.reduceat(np.where(valid, values, -np.inf), heads)
+
+
+def combine_moments(parts):
+    # Combina os baldes (fórmula de Chan et al., de uma vez para todos) em
+    # um stats.RunningStats
+    count = np.concatenate([part.count[lo:hi] for part, lo, hi in parts])
+    mean = np.concatenate([part.mean[lo:hi] for part, lo, hi in parts])
+    m2 = np.concatenate([part.m2[lo:hi] for part, lo, hi in parts])
+    combined = stats.RunningStats()
+    combined.count = int(count.sum())
+    if combined.count == 0:
+        return combined
+    combined.mean = float((count * mean).sum() / combined.count)
+    combined.m2 = float(m2.sum() + (count * (mean - combined.mean) ** 2).sum())
+    combined.min = min(float(part.min[lo:hi].min()) for part, lo, hi in parts if hi > lo)
+    combined.max = max(float(part.max[lo:hi].max()) for part, lo, hi in parts if hi > lo)
+    return combined
+
+
+class CodeCounts:
+    # Contagens de uma coluna categórica (ou dos bins de um histograma) por
+    # balde, em formato esparso: os códigos presentes em cada balde ficam em
+    # codes[offsets[i]:offsets[i + 1]]. Códigos negativos não contam
+    def __init__(self, codes, starts):
+        bucket = np.repeat(np.arange(len(starts) - 1), np.diff(starts))
+        valid = codes >= 0
+        width = max(int(codes.max()), 0) + 1
+        keys, self.counts = np.unique(bucket[valid] * width + codes[valid], return_counts=True)
+        self.codes = (keys % width).astype(np.int32)
+        self.offsets = np.searchsorted(keys // width, np.arange(len(starts)))
+
+
+def sum_counts(parts, size):
+    # Contagens somadas dos baldes cobertos, por código
+    codes = np.concatenate([part.codes[part.offsets[lo]:part.offsets[hi]] for part, lo, hi in parts])
+    counts = np.concatenate([part.counts[part.offsets[lo]:part.offsets[hi]] for part, lo, hi in parts])
+    return np.bincount(codes, weights=counts, minlength=size).astype(np.int64)
+
+
+def combine_counts(parts, categories, column):
+    totals = sum_counts(parts, len(categories))
+    present = np.flatnonzero(totals)
+    frame = pd.DataFrame({column: np.asarray(categories)[present].astype(str), "Count": totals[present]})
+    frame["Error"] = 0
+    return frame.sort_values(by="Count", ascending=False, kind='stable').reset_index(drop=True)
+
+
+def combine_histograms(parts, grid, summary):
+    # Histograma da janela nos mesmos bins do histograma da captura inteira
+    counts = sum_counts(parts, len(grid.counts))
+    return distribution.Histogram(grid.start, grid.bin_width, counts, summary)
+
+
+class Buckets:
+    # Agregados de cada balde não vazio de uma largura. Como os pacotes estão
+    # em ordem de tempo, cada balde é um intervalo contínuo de linhas
+    def __init__(self, times, width, protocols, sources, lengths, inter_arrival_times,
+                 length_bins, inter_arrival_time_bins):
+        self.width = width
+        self.ids, heads = np.unique(np.floor(times / width).astype(np.int64), return_index=True)
+        self.starts = np.append(heads, len(times))
+        self.length = Moments(lengths, self.starts)
+        self.inter_arrival_time = Moments(inter_arrival_times, self.starts)
+        self.protocols = CodeCounts(protocols, self.starts)
+        self.sources = CodeCounts(sources, self.starts)
+        self.length_bins = CodeCounts(length_bins, self.starts)
+        self.inter_arrival_time_bins = CodeCounts(inter_arrival_time_bins, self.starts)
+
+    def span(self, first, last):
+        # Baldes com id em [first, last)
+        return np.searchsorted(self.ids, first), np.searchsorted(self.ids, last)
+
+
+class TimeIndex:
+    # Montado na primeira consulta com janela, apenas para capturas não
+    # vazias, e guardado junto da captura. Não guarda valores por pacote,
+    # exceto a ordem de tempo das capturas fora de ordem
+    def __init__(self, df):
+        times = df["Time"].to_numpy(dtype=np.float64)
+        # As capturas normalmente já estão em ordem de tempo
+        self.order = None if len(times) < 2 or np.all(times[1:] >= times[:-1]) else np.argsort(times, kind='stable')
+
+        times = self._ordered(times)
+        lengths = self._ordered(df["Length"].to_numpy(dtype=np.float64))
+        inter_arrival_times = np.diff(times, prepend=np.nan)
+        self.protocol_categories = df["Protocol"].cat.categories
+        self.source_categories = df["Source"].cat.categories
+        protocols = self._ordered(df["Protocol"].cat.codes.to_numpy())
+        sources = self._ordered(df["Source"].cat.codes.to_numpy())
+
+        # Os histogramas dos baldes usam os bins dos histogramas da captura
+        # inteira, para que possam ser somados
+        self.length_grid = distribution.histogram(lengths)
+        self.inter_arrival_time_grid = distribution.histogram(inter_arrival_times)
+        length_bins = self.length_grid.index(lengths)
+        inter_arrival_time_bins = self.inter_arrival_time_grid.index(inter_arrival_times)
+
+        self.levels = [Buckets(times, width, protocols, sources, lengths, inter_arrival_times,
+                               length_bins, inter_arrival_time_bins)
+                       for width in BUCKET_SECONDS]
+
+    def _ordered(self, values):
+        return values if self.order is None else values[self.order]
+
+    def rows(self, start, end):
+        # Posições no frame dos pacotes com start <= Time < end: um recorte,
+        # se a captura já está em ordem de tempo. Com limites inteiros, são
+        # as linhas dos segundos [start, end)
+        seconds = self.levels[0]
+        lo, hi = seconds.starts[list(seconds.span(start, end))]
+        if self.order is None:
+            return slice(int(lo), int(hi))
+        return self.order[lo:hi]
+
+    def values(self, df, start, end):
+        # Time e Length dos pacotes da janela, em ordem de tempo
+        rows = self.rows(start, end)
+        return df["Time"].to_numpy()[rows], df["Length"].to_numpy()[rows]
+
+    def _parts(self, start, end):
+        # Baldes que cobrem [start, end): os minutos inteiros da janela e os
+        # segundos das pontas
+        seconds, minutes = self.levels
+        first = -(-start // minutes.width)
+        last = end // minutes.width
+        if first >= last:
+            return [(seconds, *seconds.span(start, end))]
+        return [(seconds, *seconds.span(start, first * minutes.width)),
+                (minutes, *minutes.span(first, last)),
+                (seconds, *seconds.span(last * minutes.width, end))]
+
+    def aggregates(self, start, end):
+        # Apenas baldes: o custo depende da quantidade de baldes e de bins
+        # ocupados na janela, não da quantidade de pacotes
+        parts = self._parts(start, end)
+        packet_count = int(sum(part.starts[hi] - part.starts[lo] for part, lo, hi in parts))
+
+        protocol_counts = combine_counts([(part.protocols, lo, hi) for part, lo, hi in parts],
+                                         self.protocol_categories, "Protocol")
+        protocol_counts["Percentage"] = (protocol_counts["Count"] / max(packet_count, 1)) * 100
+        source_counts = combine_counts([(part.sources, lo, hi) for part, lo, hi in parts],
+                                       self.source_categories, "Source")
+
+        # Quartis aproximados pelos histogramas da janela
+        length_histogram = combine_histograms(
+            [(part.length_bins, lo, hi) for part, lo, hi in parts], self.length_grid,
+            combine_moments([(part.length, lo, hi) for part, lo, hi in parts]))
+        inter_arrival_time_histogram = combine_histograms(
+            [(part.inter_arrival_time_bins, lo, hi) for part, lo, hi in parts], self.inter_arrival_time_grid,
+            combine_moments([(part.inter_arrival_time, lo, hi) for part, lo, hi in parts]))
+
+        return analysis.Aggregates(
+            packet_count=packet_count,
+            protocol_counts=protocol_counts,
+            source_counts=source_counts,
+            length_stats=stats.describe(length_histogram.summary,
+                                        distribution.quantiles(length_histogram, stats.PERCENTILES)),
+            inter_arrival_time_stats=stats.describe(
+                inter_arrival_time_histogram.summary,
+                distribution.quantiles(inter_arrival_time_histogram, stats.PERCENTILES)),
+            length_histogram=length_histogram,
+            inter_arrival_time_histogram=inter_arrival_time_histogram,
+            time_bounds=(start, end),
+        )
+
+
+def time_index(dataset):
+    return dataset.derived(DERIVED_NAME, TimeIndex, persist=True)
+
+
+# Janela [início, fim) escolhida no seletor, ou None se cobre a captura
+# inteira. Usa apenas os agregados, sem ler o frame
+def time_span(aggregates, window):
+    if not window or aggregates.time_bounds is None:
+        return None
+    first, last = aggregates.time_bounds
+    start, end = max(int(window[0]), first), min(int(window[1]), last)
+    if start <= first and end >= last:
+        return None
+    return start, max(end, start)
+
+
+def window_aggregates(dataset, window):
+    span = time_span(dataset.aggregates, window)
+    if span is None:
+        return dataset.aggregates
+    index = time_index(dataset)
+    with metrics.stage('aggregate'):
+        return index.aggregates(*span)